@@ -1,9 +1,50 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
+import threading, time
+import requests
+from .cache import ResponseCache, HttpResponse, CacheMiss, get_cache
+from .http_client import get_client, RETRY_STATUSES
+from .health import get_health
+from . import metrics
 
-@dataclass
+# Normalized fields every adapter result can carry (merge order in the orchestrator)
+ENRICHED_FIELDS = ("annual_revenue_usd", "marketed_products_count", "launches_last_5y",
+                   "late_stage_assets_count", "top_ta", "top_ta_share", "is_global_big_pharma")
+
+# Provenance entries are shared between results: identical (source_url, as_of, method, notes)
+# tuples map to one dict, and as_of is kept to the second so a batch produces few distinct
+# entries. Shared entries must be treated as read-only (replace, never mutate).
+PROVENANCE_INTERN_SIZE = 100_000
+_provenance: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+_provenance_lock = threading.Lock()
+_now_iso: Tuple[int, str] = (0, "")
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO string at second precision (formatted once per second)."""
+    global _now_iso
+    now = int(time.time())
+    if _now_iso[0] != now:
+        _now_iso = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+    return _now_iso[1]
+
+def provenance_entry(source_url: Any, as_of: Any, method: Any, notes: Any = None) -> Dict[str, Any]:
+    """The shared provenance dict for these values (see PROVENANCE_INTERN_SIZE)."""
+    key = (source_url, as_of, method, notes)
+    try:
+        entry = _provenance.get(key)
+    except TypeError:  # unhashable values from a stored payload: leave unshared
+        return {"source_url": source_url, "as_of": as_of, "method": method, "notes": notes}
+    if entry is None:
+        with _provenance_lock:
+            if len(_provenance) >= PROVENANCE_INTERN_SIZE:
+                _provenance.clear()
+            entry = _provenance.setdefault(key, {"source_url": source_url, "as_of": as_of,
+                                                 "method": method, "notes": notes})
+    return entry
+
+@dataclass(slots=True)
 class EnrichmentResult:
     # Normalized fields (all optional; fill what you can)
     annual_revenue_usd: Optional[float] = None
@@ -19,14 +60,98 @@ class EnrichmentResult:
 
     def set_with_provenance(self, field_name: str, value: Any, source_url: str, method: str = "scrape", as_of: Optional[datetime] = None, notes: Optional[str] = None):
         setattr(self, field_name, value)
-        self.provenance[field_name] = {
-            "source_url": source_url,
-            "as_of": (as_of or datetime.now(timezone.utc)).isoformat(),
-            "method": method,
-            "notes": notes
-        }
+        self.provenance[field_name] = provenance_entry(
+            source_url, as_of.isoformat() if as_of is not None else utc_now_iso(), method, notes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat enrichment dict (normalized fields + provenance) as stored in bulk payloads."""
+        d = {name: getattr(self, name) for name in ENRICHED_FIELDS}
+        d["provenance"] = self.provenance
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "EnrichmentResult":
+        res = cls(**{name: d.get(name) for name in ENRICHED_FIELDS})
+        res.provenance = {f: provenance_entry(p.get("source_url"), p.get("as_of"), p.get("method"), p.get("notes"))
+                          if isinstance(p, dict) else p for f, p in (d.get("provenance") or {}).items()}
+        return res
+
+    def field_as_of(self, field_name: str) -> Optional[datetime]:
+        """When `field_name` was last observed; None if unknown or not a timestamp (e.g. "seed")."""
+        as_of = (self.provenance.get(field_name) or {}).get("as_of")
+        if not as_of:
+            return None
+        try:
+            ts = datetime.fromisoformat(str(as_of).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
 
 class SourceAdapter:
     """Interface all adapters must implement."""
+    # Remote host the adapter talks to; used for per-host concurrency caps (None = local)
+    HOST: Optional[str] = None
+    # Normalized fields this adapter can fill (lets callers skip it when they are already known)
+    PROVIDES: Tuple[str, ...] = ()
+    # Relative cost of one enrich() call, roughly in network round trips (0 = local lookup)
+    COST: float = 1.0
+    # Cache namespace and freshness window (seconds) for responses from this source
+    SOURCE: str = "default"
+    CACHE_TTL: Optional[float] = None
+
+    # Per-instance override of the process-wide response cache
+    cache: Optional[ResponseCache] = None
+
     def enrich(self, company_name: str) -> EnrichmentResult:
         raise NotImplementedError
+
+    def provides(self) -> Tuple[str, ...]:
+        """Fields this instance can fill right now (e.g. () while a local index is missing)."""
+        return self.PROVIDES
+
+    def cost(self) -> float:
+        return self.COST
+
+    def fetch(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+              timeout: float = 20) -> HttpResponse:
+        """
+        GET through the shared response cache (fresh hit → no request; stale → conditional GET).
+        Network requests go through the pooled, per-host rate-limited client; `timeout` is an
+        upper bound, tightened to the source's observed latency (see adapters.health).
+        Raises requests.HTTPError when the source is still failing (429/5xx) after retries,
+        so the orchestrator's circuit breaker sees it; other statuses are returned as-is.
+        """
+        cache = self.cache or get_cache()
+        key = requests.Request("GET", url, params=params).prepare().url
+        entry = cache.get(key)
+        if entry is not None and (entry.fresh or cache.offline):
+            metrics.record_cache(self.SOURCE, "hit")
+            return entry.response
+        if cache.offline:
+            metrics.record_cache(self.SOURCE, "offline_miss")
+            raise CacheMiss(key)
+
+        req_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                req_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                req_headers["If-Modified-Since"] = entry.last_modified
+
+        latency = get_health().latency(self.SOURCE)
+        r = get_client().get(url, params=params, headers=req_headers, timeout=latency.timeout(timeout))
+        if r.status_code in RETRY_STATUSES:
+            r.raise_for_status()
+        latency.record(r.elapsed.total_seconds())  # server time only, not rate-limit waits
+        ttl = cache.ttl_for(self.SOURCE, self.CACHE_TTL)
+        if entry is not None and r.status_code == 304:
+            metrics.record_cache(self.SOURCE, "revalidated")
+            cache.touch(key, ttl)
+            return entry.response
+        metrics.record_cache(self.SOURCE, "miss")
+
+        resp = HttpResponse(url=r.url, status_code=r.status_code, content=r.content,
+                            headers=dict(r.headers), encoding=r.encoding or r.apparent_encoding)
+        if r.status_code == 200:
+            cache.put(key, self.SOURCE, resp, ttl)
+        return resp
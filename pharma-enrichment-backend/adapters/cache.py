@@ -0,0 +1,168 @@
+from __future__ import annotations
+import os, json, time, sqlite3, threading, zipfile
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get("ENRICHMENT_DATA_DIR", os.path.join(BACKEND_DIR, ".data"))
+
+CACHE_PATH = os.environ.get("ENRICHMENT_CACHE_PATH", os.path.join(DATA_DIR, "http_cache.sqlite3"))
+CACHE_MAX_BYTES = int(float(os.environ.get("ENRICHMENT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+CACHE_OFFLINE = os.environ.get("ENRICHMENT_CACHE_OFFLINE", "").lower() in ("1", "true", "yes")
+DEFAULT_TTL_S = 24 * 3600
+
+def snapshot_time(path: str) -> float:
+    """When a downloaded bulk export was generated: its newest zip member, else the file's mtime."""
+    if os.path.isfile(path) and zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            stamps = [time.mktime(info.date_time + (0, 0, -1)) for info in zf.infolist()]
+        if stamps:
+            return max(stamps)
+    return os.path.getmtime(path)
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL has never been fetched."""
+
+@dataclass
+class HttpResponse:
+    """Minimal stand-in for requests.Response that can be rebuilt from the cache."""
+    url: str
+    status_code: int
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    encoding: Optional[str] = None
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise IOError(f"HTTP {self.status_code} for {self.url}")
+
+@dataclass
+class CacheEntry:
+    response: HttpResponse
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+class ResponseCache:
+    """
+    SQLite-backed store of successful GET responses shared by all adapters.
+      - per-source TTLs (adapter CACHE_TTL, overridable via ttl_by_source)
+      - LRU eviction once the stored bodies exceed max_bytes
+      - ETag / Last-Modified kept so stale entries can be revalidated with a conditional GET
+      - offline mode: never touch the network, serve whatever is stored
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES, offline: bool = CACHE_OFFLINE,
+                 ttl_by_source: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.ttl_by_source = dict(ttl_by_source or {})
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                source TEXT,
+                url TEXT,
+                status INTEGER,
+                headers TEXT,
+                encoding TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                expires_at REAL,
+                accessed_at REAL,
+                size INTEGER
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, source: str, default: Optional[float] = None) -> float:
+        if source in self.ttl_by_source:
+            return self.ttl_by_source[source]
+        return DEFAULT_TTL_S if default is None else default
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, encoding, body, etag, last_modified, expires_at FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        url, status, headers, encoding, body, etag, last_modified, expires_at = row
+        resp = HttpResponse(url=url, status_code=status, content=body, headers=json.loads(headers or "{}"),
+                            encoding=encoding, from_cache=True)
+        return CacheEntry(resp, etag, last_modified, expires_at)
+
+    def put(self, key: str, source: str, resp: HttpResponse, ttl: float) -> None:
+        now = time.time()
+        etag = resp.headers.get("ETag") or resp.headers.get("etag")
+        last_modified = resp.headers.get("Last-Modified") or resp.headers.get("last-modified")
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._total += len(resp.content) - (old[0] if old else 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, resp.url, resp.status_code, json.dumps(dict(resp.headers)), resp.encoding,
+                 resp.content, etag, last_modified, now, now + ttl, now, len(resp.content)))
+            self._evict()
+
+    def touch(self, key: str, ttl: float) -> None:
+        """Mark a stale entry fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key))
+
+    def clear(self, source: Optional[str] = None) -> None:
+        with self._lock:
+            if source is None:
+                self._db.execute("DELETE FROM responses")
+            else:
+                self._db.execute("DELETE FROM responses WHERE source = ?", (source,))
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        # Drop least-recently-used entries until we are back under the budget
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total -= size
+            if self._total <= self.max_bytes:
+                break
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+def get_cache() -> ResponseCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+def configure_cache(cache: Optional[ResponseCache] = None, **kwargs) -> ResponseCache:
+    """Replace the process-wide cache, e.g. configure_cache(offline=True) or configure_cache(path=":memory:")."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache or ResponseCache(**kwargs)
+        return _default_cache
@@ -1,58 +1,93 @@
 from __future__ import annotations
-import requests
+from datetime import datetime, timezone
+from typing import Optional
+from . import metrics
 from .base import EnrichmentResult, SourceAdapter
+from .ctgov_index import CtgovIndex, get_ctgov_index
 
 class ClinicalTrialsAdapter(SourceAdapter):
     """
     Query ClinicalTrials.gov for Phase 3/4 trials by Sponsor/Collaborator ~ company_name.
     We store counts as approximations of late-stage assets / upcoming launches.
+    When a bulk-export snapshot has been ingested (see ctgov_index) companies are answered
+    from the local sponsor index; the live API is only queried for companies not in it.
     """
 
+    HOST = "clinicaltrials.gov"
+    PROVIDES = ("late_stage_assets_count",)
+    SOURCE = "clinicaltrials"
+    CACHE_TTL = 24 * 3600
+
     API = "https://clinicaltrials.gov/api/query/study_fields"
     FIELDS = "NCTId,Phase,OverallStatus,StartDate,PrimaryCompletionDate"
     MAX_RNK = 1000
+    LIVE_FALLBACK = True
+
+    def __init__(self, index: Optional[CtgovIndex] = None):
+        self.index = index
+
+    def cost(self) -> float:
+        return 0.0 if (self.index or get_ctgov_index()) is not None else self.COST
 
     def enrich(self, company_name: str) -> EnrichmentResult:
         res = EnrichmentResult()
-        try:
-            params = {
-                "expr": f'(Sponsor/{company_name}) OR (Collaborator/{company_name}) AND (AREA[Phase]Phase 3 OR AREA[Phase]Phase 4)',
-                "fields": self.FIELDS,
-                "min_rnk": 1,
-                "max_rnk": self.MAX_RNK,
-                "fmt": "json"
-            }
-            r = requests.get(self.API, params=params, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-            studies = data.get("StudyFieldsResponse", {}).get("StudyFields", [])
-            late_stage_count = len(studies)
-
-            # Naive upcoming proxy: count "Recruiting" or "Active, not recruiting" Phase 3
-            upcoming = 0
-            for s in studies:
-                phase = " ".join(s.get("Phase", []))
-                status = " ".join(s.get("OverallStatus", []))
-                if "Phase 3" in phase and any(x in status for x in ["Recruiting", "Active, not recruiting", "Enrolling by invitation"]):
-                    upcoming += 1
-
-            query_url = r.url
-            if late_stage_count > 0:
-                res.set_with_provenance(
-                    "late_stage_assets_count",
-                    late_stage_count,
-                    source_url=query_url,
-                    method="api",
-                    notes="Phase 3/4 count (approx)"
-                )
-                res.set_with_provenance(
-                    "launches_last_5y",  # optional proxy; leave None if uncertain
-                    None,
-                    source_url=query_url,
-                    method="inference",
-                    notes="Derive separately from product metadata if available."
-                )
-                # You could also set num_upcoming in your orchestrator; keeping adapter minimal.
+        index = self.index or get_ctgov_index()
+        hit = index.lookup(company_name) if index is not None else None
+        if hit is not None:
+            late_stage_count, upcoming = hit
+            res.set_with_provenance(
+                "late_stage_assets_count",
+                late_stage_count,
+                source_url=index.source,
+                method="bulk_index",
+                as_of=datetime.fromtimestamp(index.as_of, timezone.utc),
+                notes=f"Phase 3/4 count from export snapshot; {upcoming} active Phase 3"
+            )
             return res
-        except Exception:
+        if index is not None and not self.LIVE_FALLBACK:
             return res
+        params = {
+            "expr": f'(Sponsor/{company_name}) OR (Collaborator/{company_name}) AND (AREA[Phase]Phase 3 OR AREA[Phase]Phase 4)',
+            "fields": self.FIELDS,
+            "min_rnk": 1,
+            "max_rnk": self.MAX_RNK,
+            "fmt": "json"
+        }
+        r = self.fetch(self.API, params=params, timeout=30)
+        if r.status_code >= 500:
+            r.raise_for_status()
+        if r.status_code != 200:
+            # 4xx: the API rejected this query (e.g. the legacy study_fields endpoint answers 404).
+            # That is no data for this company, not an outage, so the breaker must not count it.
+            return res
+        with metrics.parse_timer(self.SOURCE):
+            data = r.json()
+        studies = data.get("StudyFieldsResponse", {}).get("StudyFields", [])
+        late_stage_count = len(studies)
+
+        # Naive upcoming proxy: count "Recruiting" or "Active, not recruiting" Phase 3
+        upcoming = 0
+        for s in studies:
+            phase = " ".join(s.get("Phase", []))
+            status = " ".join(s.get("OverallStatus", []))
+            if "Phase 3" in phase and any(x in status for x in ["Recruiting", "Active, not recruiting", "Enrolling by invitation"]):
+                upcoming += 1
+
+        query_url = r.url
+        if late_stage_count > 0:
+            res.set_with_provenance(
+                "late_stage_assets_count",
+                late_stage_count,
+                source_url=query_url,
+                method="api",
+                notes="Phase 3/4 count (approx)"
+            )
+            res.set_with_provenance(
+                "launches_last_5y",  # optional proxy; leave None if uncertain
+                None,
+                source_url=query_url,
+                method="inference",
+                notes="Derive separately from product metadata if available."
+            )
+            # You could also set num_upcoming in your orchestrator; keeping adapter minimal.
+        return res
@@ -1,55 +1,215 @@
 from __future__ import annotations
-import re, time, random
+import os, re, json, time, atexit, threading
 import requests
+from typing import Dict, Optional
 from bs4 import BeautifulSoup
+from . import metrics
 from .base import EnrichmentResult, SourceAdapter
+from .cache import DATA_DIR
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; EnrichmentBot/1.0)"}
 
+SLUG_TABLE_PATH = os.environ.get("CMC_SLUG_TABLE_PATH", os.path.join(DATA_DIR, "cmc_slugs.json"))
+SLUG_REBOOTSTRAP_S = 30 * 24 * 3600
+# After a failed or empty bootstrap, the list page is tried again this much later
+SLUG_BOOTSTRAP_RETRY_S = 600
+# Slugs learned from searches are written out at most this often (and at exit)
+SLUG_SAVE_INTERVAL_S = 30.0
+
+def _key(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+class SlugTable:
+    """
+    Persistent name/alias/ticker → revenue path ("/pfizer/revenue/") map.
+    Bootstrapped from the pharma-by-revenue list page and extended whenever a search succeeds.
+    Additions are saved at most every `save_interval_s`; flush() writes any still pending.
+    """
+
+    def __init__(self, path: str = SLUG_TABLE_PATH, save_interval_s: float = SLUG_SAVE_INTERVAL_S):
+        self.path = path
+        self.save_interval_s = save_interval_s
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self.bootstrapped_at = 0.0
+        self.paths: Dict[str, str] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            self.bootstrapped_at = data.get("bootstrapped_at", 0.0)
+            self.paths = data.get("paths", {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name: str) -> Optional[str]:
+        return self.paths.get(_key(name))
+
+    def add(self, names, path: str, save: bool = True) -> None:
+        with self._lock:
+            for n in names:
+                if n and _key(n):
+                    self.paths[_key(n)] = path
+                    self._dirty = True
+            if save and time.monotonic() - self._saved_at >= self.save_interval_s:
+                self._save()
+
+    def flush(self) -> None:
+        """Write additions not saved yet (see save_interval_s)."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def mark_bootstrapped(self) -> None:
+        with self._lock:
+            self.bootstrapped_at = time.time()
+            self._save()
+
+    def defer_bootstrap(self, seconds: float) -> None:
+        """After a failed bootstrap, wait `seconds` before trying the list page again (not persisted)."""
+        self.bootstrapped_at = time.time() - SLUG_REBOOTSTRAP_S + seconds
+
+    @property
+    def needs_bootstrap(self) -> bool:
+        return time.time() - self.bootstrapped_at > SLUG_REBOOTSTRAP_S
+
+    def _save(self) -> None:
+        self._dirty, self._saved_at = False, time.monotonic()
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"bootstrapped_at": self.bootstrapped_at, "paths": self.paths}, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
 class CompaniesMarketCapAdapter(SourceAdapter):
     """
     Lightweight scraper for https://companiesmarketcap.com/pharmaceuticals/largest-pharmaceutical-companies-by-revenue/
     Strategy:
-      1) Hit the pharma-by-revenue list page (or company subpage if you map names → slugs).
+      1) Resolve the company's revenue page via the slug table (bootstrapped from the list page);
+         fall back to the site search and remember the slug it finds.
       2) Parse revenue TTM value when present.
     NOTE: This is a stub; replace the parsing with site-specific logic you validate.
     """
 
+    HOST = "companiesmarketcap.com"
+    PROVIDES = ("annual_revenue_usd",)
+    COST = 2.0  # slug resolution (search when not in the table) + revenue page
+    SOURCE = "companiesmarketcap"
+    CACHE_TTL = 24 * 3600
+
     BASE = "https://companiesmarketcap.com"
+    LIST_URL = BASE + "/pharmaceuticals/largest-pharmaceutical-companies-by-revenue/"
 
-    def enrich(self, company_name: str) -> EnrichmentResult:
-        res = EnrichmentResult()
-        try:
-            # Naive strategy: search page (fallback) – you should replace with a proper company slug map.
-            search_url = f"{self.BASE}/search/?q={requests.utils.quote(company_name)}"
-            html = requests.get(search_url, headers=HEADERS, timeout=20).text
+    _slugs: Optional[SlugTable] = None
+    _slugs_lock = threading.Lock()
+
+    def __init__(self, slug_table: Optional[SlugTable] = None):
+        if slug_table is not None:
+            self._slugs = slug_table
+
+    @property
+    def slugs(self) -> SlugTable:
+        cls = type(self)
+        if self._slugs is None:
+            with cls._slugs_lock:
+                if cls._slugs is None:
+                    cls._slugs = SlugTable()
+        return self._slugs
+
+    @classmethod
+    def use_slug_table(cls, table: SlugTable) -> None:
+        """Replace the table shared by all instances (e.g. a fresh one for a benchmark run)."""
+        with cls._slugs_lock:
+            if cls._slugs is not None:
+                cls._slugs.flush()
+            cls._slugs = table
+
+    def bootstrap_slugs(self) -> int:
+        """
+        One pass over the list page: every company row → its /{slug}/revenue/ path.
+        The table only counts as bootstrapped when rows were found; otherwise (error page,
+        changed markup) the list page is retried after SLUG_BOOTSTRAP_RETRY_S.
+        """
+        resp = self.fetch(self.LIST_URL, headers=HEADERS, timeout=20)
+        resp.raise_for_status()
+        html = resp.text
+        with metrics.parse_timer(self.SOURCE):
             soup = BeautifulSoup(html, "html.parser")
+        added = 0
+        for a in soup.select("a[href]"):
+            m = re.match(r"^/([^/]+)/(?:marketcap|revenue)/$", a.get("href", ""))
+            if not m:
+                continue
+            name_el = a.select_one(".company-name")
+            code_el = a.select_one(".company-code")
+            names = [name_el.get_text(strip=True) if name_el else a.get_text(" ", strip=True)]
+            if code_el:
+                names.append(code_el.get_text(strip=True))
+            self.slugs.add(names, f"/{m.group(1)}/revenue/", save=False)
+            added += 1
+        if added:
+            self.slugs.mark_bootstrapped()
+        else:
+            self.slugs.defer_bootstrap(SLUG_BOOTSTRAP_RETRY_S)
+        return added
+
+    def resolve(self, company_name: str) -> Optional[str]:
+        """Revenue page URL for company_name, or None if the search finds nothing."""
+        slugs = self.slugs
+        path = slugs.get(company_name)
+        if path is None and slugs.needs_bootstrap:
+            with self._slugs_lock:
+                if slugs.needs_bootstrap:
+                    try:
+                        self.bootstrap_slugs()
+                    except Exception:
+                        slugs.defer_bootstrap(SLUG_BOOTSTRAP_RETRY_S)  # don't retry the list page on every company
+            path = slugs.get(company_name)
+        if path is not None:
+            return self.BASE + path
+
+        # Naive strategy: search page (fallback) for names the list page does not cover
+        search_url = f"{self.BASE}/search/?q={requests.utils.quote(company_name)}"
+        search = self.fetch(search_url, headers=HEADERS, timeout=20)
+        with metrics.parse_timer(self.SOURCE):
+            soup = BeautifulSoup(search.text, "html.parser")
             # Heuristic: pick first result linking to /{company}/revenue/
             link = soup.select_one("a[href*='/revenue/']")
-            if not link:
-                return res  # No data found
+        if not link:
+            return None
+        slugs.add([company_name], link.get("href"))
+        return self.BASE + link.get("href")
 
-            company_url = self.BASE + link.get("href")
-            time.sleep(random.uniform(0.6, 1.2))  # polite delay
-            html2 = requests.get(company_url, headers=HEADERS, timeout=20).text
+    def enrich(self, company_name: str) -> EnrichmentResult:
+        res = EnrichmentResult()
+        company_url = self.resolve(company_name)
+        if not company_url:
+            return res  # No data found
+
+        html2 = self.fetch(company_url, headers=HEADERS, timeout=20).text
+        with metrics.parse_timer(self.SOURCE):
             soup2 = BeautifulSoup(html2, "html.parser")
 
             # Heuristic extraction: look for figures with $ and "TTM" text
             text = soup2.get_text(" ", strip=True)
-            m = re.search(r"Revenue.*?\$([\d\.,]+)\s*(?:billion|million)?\s*TTM", text, re.I)
-            if m:
-                raw = m.group(1).replace(",", "")
-                # Try to detect scale (very naive)
-                scale_billion = re.search(r"\b(billion)\b", text, re.I)
-                revenue = float(raw) * (1_000_000_000 if scale_billion else 1_000_000)
-                res.set_with_provenance(
-                    "annual_revenue_usd",
-                    revenue,
-                    source_url=company_url,
-                    method="scrape",
-                    notes="TTM revenue parsed heuristically"
-                )
-            return res
-        except Exception as e:
-            # Fail quietly; return empty result
-            return res
+        m = re.search(r"Revenue.*?\$([\d\.,]+)\s*(?:billion|million)?\s*TTM", text, re.I)
+        if m:
+            raw = m.group(1).replace(",", "")
+            # Try to detect scale (very naive)
+            scale_billion = re.search(r"\b(billion)\b", text, re.I)
+            revenue = float(raw) * (1_000_000_000 if scale_billion else 1_000_000)
+            res.set_with_provenance(
+                "annual_revenue_usd",
+                revenue,
+                source_url=company_url,
+                method="scrape",
+                notes="TTM revenue parsed heuristically"
+            )
+        return res
+
+@atexit.register
+def _flush_slugs() -> None:
+    if CompaniesMarketCapAdapter._slugs is not None:
+        CompaniesMarketCapAdapter._slugs.flush()
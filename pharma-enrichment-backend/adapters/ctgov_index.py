@@ -0,0 +1,123 @@
+from __future__ import annotations
+import os, gzip, json, time, sqlite3, zipfile, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .names import get_resolver
+from .cache import DATA_DIR, snapshot_time
+
+CTGOV_INDEX_PATH = os.environ.get("CTGOV_INDEX_PATH", os.path.join(DATA_DIR, "ctgov_index.sqlite3"))
+
+LATE_PHASES = {"PHASE3", "PHASE4"}
+UPCOMING_STATUSES = {"RECRUITING", "ACTIVE_NOT_RECRUITING", "ENROLLING_BY_INVITATION"}
+
+def iter_studies(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream studies from a ClinicalTrials.gov (API v2) bulk export without loading it whole:
+      - ctg-studies.json.zip: one JSON document per study
+      - .ndjson / .jsonl (optionally .gz): one study per line
+    """
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            for member in zf.namelist():
+                if member.endswith(".json"):
+                    with zf.open(member) as f:
+                        yield json.load(f)
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def _study_orgs_and_flags(study: Dict[str, Any]) -> Tuple[set, bool, bool]:
+    proto = study.get("protocolSection") or {}
+    phases = set((proto.get("designModule") or {}).get("phases") or [])
+    status = (proto.get("statusModule") or {}).get("overallStatus") or ""
+    sc = proto.get("sponsorCollaboratorsModule") or {}
+    names = [(sc.get("leadSponsor") or {}).get("name")] + [c.get("name") for c in sc.get("collaborators") or []]
+    key = get_resolver().key
+    orgs = {key(n) for n in names if n}
+    orgs.discard("")
+    late = bool(phases & LATE_PHASES)
+    upcoming = "PHASE3" in phases and status in UPCOMING_STATUSES
+    return orgs, late, upcoming
+
+def build_ctgov_index(export_path: str, index_path: str = CTGOV_INDEX_PATH, as_of: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Aggregate Phase 3/4 and active Phase 3 study counts per sponsor/collaborator entity
+    (NameResolver key, so "Merck Sharp & Dohme LLC" counts toward Merck & Co.). Every sponsor
+    in the export is indexed, with zero counts if none of its studies is late-stage, so the
+    adapter answers it locally too.
+    as_of: when the export was taken (epoch seconds; default: see snapshot_time)
+    """
+    counts: Dict[str, list] = {}
+    studies = 0
+    for study in iter_studies(export_path):
+        studies += 1
+        orgs, late, upcoming = _study_orgs_and_flags(study)
+        for org in orgs:
+            c = counts.setdefault(org, [0, 0])
+            c[0] += late
+            c[1] += upcoming
+
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp = index_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    db.execute("CREATE TABLE sponsors (key TEXT PRIMARY KEY, late_stage INTEGER, upcoming INTEGER) WITHOUT ROWID")
+    db.execute("CREATE TABLE meta (k TEXT PRIMARY KEY, v TEXT)")
+    db.executemany("INSERT INTO sponsors VALUES (?, ?, ?)", ((k, c[0], c[1]) for k, c in counts.items()))
+    meta = {"source": os.path.abspath(export_path), "built_at": time.time(),
+            "as_of": snapshot_time(export_path) if as_of is None else as_of,
+            "studies": studies, "sponsors": len(counts)}
+    db.executemany("INSERT INTO meta VALUES (?, ?)", ((k, json.dumps(v)) for k, v in meta.items()))
+    db.commit()
+    db.close()
+    os.replace(tmp, index_path)  # readers never see a half-built index
+    return meta
+
+class CtgovIndex:
+    """Read side: the sponsor table loaded into a dict for in-process lookups."""
+
+    def __init__(self, index_path: str = CTGOV_INDEX_PATH):
+        db = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        try:
+            self.counts = {k: (late, up) for k, late, up in db.execute("SELECT key, late_stage, upcoming FROM sponsors")}
+            meta = {k: json.loads(v) for k, v in db.execute("SELECT k, v FROM meta")}
+        finally:
+            db.close()
+        self.source = meta.get("source", index_path)
+        self.built_at = meta.get("built_at", 0.0)
+        self.as_of = meta.get("as_of", self.built_at)  # snapshot time (older indexes: build time)
+
+    def lookup(self, company_name: str) -> Optional[Tuple[int, int]]:
+        """(phase 3/4 studies, active phase 3 studies) where the company is sponsor or collaborator."""
+        return self.counts.get(get_resolver().key(company_name))
+
+_index: Optional[CtgovIndex] = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+def get_ctgov_index(index_path: str = CTGOV_INDEX_PATH) -> Optional[CtgovIndex]:
+    """Shared index, reloaded when the file changes; None when no snapshot has been ingested."""
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return None
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            _index, _index_mtime = CtgovIndex(index_path), mtime
+        return _index
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the local ClinicalTrials.gov sponsor index from a bulk export")
+    parser.add_argument("export", help="ctg-studies.json.zip or NDJSON (.gz) export")
+    parser.add_argument("--index", default=CTGOV_INDEX_PATH)
+    parser.add_argument("--as-of", help="snapshot date (YYYY-MM-DD) if the file's own timestamps are not it")
+    args = parser.parse_args()
+    as_of = datetime.fromisoformat(args.as_of).replace(tzinfo=timezone.utc).timestamp() if args.as_of else None
+    print(json.dumps(build_ctgov_index(args.export, args.index, as_of), indent=2))
@@ -1,30 +1,56 @@
 from __future__ import annotations
-import requests, time
+import requests
+from datetime import datetime, timezone
+from typing import Optional
 from bs4 import BeautifulSoup
 from .base import EnrichmentResult, SourceAdapter
+from .sec_index import SecIndex, get_sec_index
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; EnrichmentBot/1.0) EDGAR polite"}
 
 class EdgarAdapter(SourceAdapter):
     """
-    EDGAR search stub for 10-K/20-F links. We primarily store provenance.
-    For some companies you can parse 'Business' sections to infer marketed depth or segments.
+    Annual revenue from SEC XBRL filings, answered from the local companyfacts index
+    (see sec_index). Without an index (or for companies not in it) we only store the
+    EDGAR search URL as provenance.
     """
 
+    HOST = None  # local lookups only
+    PROVIDES = ("annual_revenue_usd",)
+    COST = 0.0
+    SOURCE = "edgar"
+
     SEARCH = "https://www.sec.gov/edgar/search/#/entityName={q}&forms=10-K,20-F"
+    FILING = "https://www.sec.gov/Archives/edgar/data/{cik}/{accn}/"
+
+    def __init__(self, index: Optional[SecIndex] = None):
+        self.index = index
+
+    def provides(self):
+        # Without an index only reference provenance is recorded: nothing worth planning a call for
+        return self.PROVIDES if (self.index or get_sec_index()) is not None else ()
 
     def enrich(self, company_name: str) -> EnrichmentResult:
         res = EnrichmentResult()
-        try:
-            url = self.SEARCH.format(q=requests.utils.quote(company_name))
-            # We only record the search URL as provenance for now.
+        index = self.index or get_sec_index()
+        fact = index.annual_revenue(company_name) if index is not None else None
+        if fact is not None:
             res.set_with_provenance(
-                "annual_revenue_usd",  # DO NOT set a value here; just provenance if you later parse
-                None,
-                source_url=url,
-                method="reference",
-                notes="EDGAR search URL for latest 10-K/20-F; add parser to extract numbers."
+                "annual_revenue_usd",
+                fact["revenue_usd"],
+                source_url=self.FILING.format(cik=fact["cik"], accn=(fact["accn"] or "").replace("-", "")),
+                method="filing",
+                as_of=datetime.fromtimestamp(index.as_of, timezone.utc),
+                notes=f"{fact['concept']} FY{fact['fiscal_year']} ({fact['form']} filed {fact['filed']}, period ending {fact['period_end']})"
             )
             return res
-        except Exception:
-            return res
+        url = self.SEARCH.format(q=requests.utils.quote(company_name))
+        # Not in the local index: record the search URL as provenance only.
+        res.set_with_provenance(
+            "annual_revenue_usd",  # DO NOT set a value here; just provenance if you later parse
+            None,
+            source_url=url,
+            method="reference",
+            notes="EDGAR search URL for latest 10-K/20-F; add parser to extract numbers."
+        )
+        return res
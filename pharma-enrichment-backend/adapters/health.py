@@ -0,0 +1,156 @@
+from __future__ import annotations
+import os, time, threading
+from collections import deque
+from typing import Dict, Optional
+
+# Circuit breaker: open after this many consecutive failures, skip the source for a cool-down
+# (doubling after every failed probe, up to the max), then let one probe call through.
+BREAKER_FAILURES = int(os.environ.get("ENRICHMENT_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.environ.get("ENRICHMENT_BREAKER_COOLDOWN_S", "60"))
+BREAKER_MAX_COOLDOWN_S = 15 * 60
+
+# Adaptive timeouts: TIMEOUT_FACTOR x the recent p95 latency, within [MIN_TIMEOUT_S, adapter default]
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+TIMEOUT_PERCENTILE = 0.95
+TIMEOUT_FACTOR = 3.0
+MIN_TIMEOUT_S = 2.0
+
+class CircuitBreaker:
+    """closed → (BREAKER_FAILURES consecutive failures) → open → (cool-down) → half-open: one probe."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown_s: float = BREAKER_COOLDOWN_S,
+                 max_cooldown_s: float = BREAKER_MAX_COOLDOWN_S):
+        self.failures = failures
+        self.base_cooldown_s = cooldown_s
+        self.max_cooldown_s = max(cooldown_s, max_cooldown_s)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown_s = cooldown_s
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """May a call go through now? In half-open state only one probe is let through at a time."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_at + self.cooldown_s:
+                    return False
+                self.state = self.HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.opened_at + self.cooldown_s - time.monotonic()) if self.state == self.OPEN else 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.cooldown_s = self.base_cooldown_s
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown_s = min(self.cooldown_s * 2, self.max_cooldown_s)  # probe failed
+            elif self.consecutive_failures < self.failures:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def record_abandoned(self) -> None:
+        """The call gave up at the caller's own deadline: no verdict on the source, but a half-open probe is freed."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures,
+                "retry_in_s": round(self.retry_in(), 1)}
+
+class LatencyTracker:
+    """Sliding window of successful request latencies; derives a timeout from a high percentile."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def timeout(self, default: float) -> float:
+        """default until enough samples, then TIMEOUT_FACTOR x p95 clamped to [MIN_TIMEOUT_S, default]."""
+        with self._lock:
+            n = len(self._samples)
+        if n < LATENCY_MIN_SAMPLES:
+            return default
+        return max(min(default, MIN_TIMEOUT_S), min(default, TIMEOUT_FACTOR * self.percentile(TIMEOUT_PERCENTILE)))
+
+class SourceHealth:
+    """Breaker + latency tracker per adapter SOURCE, shared by every orchestrator in the process."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown_s: float = BREAKER_COOLDOWN_S):
+        self.failures = failures
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+
+    def breaker(self, source: str) -> CircuitBreaker:
+        with self._lock:
+            if source not in self._breakers:
+                self._breakers[source] = CircuitBreaker(self.failures, self.cooldown_s)
+            return self._breakers[source]
+
+    def latency(self, source: str) -> LatencyTracker:
+        with self._lock:
+            if source not in self._latency:
+                self._latency[source] = LatencyTracker()
+            return self._latency[source]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            sources = sorted(set(self._breakers) | set(self._latency))
+        out = {}
+        for source in sources:
+            lat = self.latency(source)
+            p50, p95 = lat.percentile(0.5), lat.percentile(TIMEOUT_PERCENTILE)
+            out[source] = {**self.breaker(source).snapshot(),
+                           "p50_s": None if p50 is None else round(p50, 3),
+                           "p95_s": None if p95 is None else round(p95, 3)}
+        return out
+
+_default_health: Optional[SourceHealth] = None
+_default_lock = threading.Lock()
+
+def get_health() -> SourceHealth:
+    global _default_health
+    with _default_lock:
+        if _default_health is None:
+            _default_health = SourceHealth()
+        return _default_health
+
+def configure_health(health: Optional[SourceHealth] = None, **kwargs) -> SourceHealth:
+    """Replace the process-wide registry, e.g. configure_health(failures=3, cooldown_s=30)."""
+    global _default_health
+    with _default_lock:
+        _default_health = health or SourceHealth(**kwargs)
+        return _default_health
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import time, random, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Tuple, Any
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from . import metrics
+
+# Per-host politeness as (requests per second, burst). SEC publishes a 10 req/s ceiling;
+# the scraped sites get a gentler default.
+DEFAULT_HOST_RATES: Dict[str, Tuple[float, float]] = {
+    "www.sec.gov": (10.0, 10),
+    "data.sec.gov": (10.0, 10),
+    "companiesmarketcap.com": (1.0, 2),
+    "www.pharmacompass.com": (1.0, 2),
+    "clinicaltrials.gov": (5.0, 5),
+}
+DEFAULT_RATE: Tuple[float, float] = (2.0, 2)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER_S = 60.0
+
+# time.monotonic() by which the current caller needs an answer (see deadline_scope)
+_deadline: ContextVar[Optional[float]] = ContextVar("http_deadline", default=None)
+
+@contextmanager
+def deadline_scope(end: Optional[float]) -> Iterator[None]:
+    """Requests made inside the block stop retrying at `end` (e.g. the orchestrator's deadline)."""
+    token = _deadline.set(end)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+class DeadlineExceeded(requests.Timeout):
+    """The caller's deadline ran out: before the request was sent, or it cut the request's timeout short."""
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/s refill up to `capacity`; acquire() blocks until one is free
+    (or gives up at the caller's deadline)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take a token; False (nothing taken) if none frees up before `deadline` (time.monotonic())."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    return False
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait >= deadline:
+                return False
+            time.sleep(wait)
+
+class HttpClient:
+    """
+    Shared pooled HTTP client: one keep-alive connection pool per host, a token bucket per host,
+    and retry with exponential backoff (honouring Retry-After) on 429/5xx and connection errors.
+    Retries stop at the caller's deadline: a wait that would end past it is not started, and
+    once it has passed nothing more is sent (DeadlineExceeded).
+    """
+
+    def __init__(self, host_rates: Optional[Dict[str, Tuple[float, float]]] = None, max_retries: int = 3,
+                 backoff_s: float = 0.5, pool_maxsize: int = 10, host_overrides: Optional[Dict[str, str]] = None):
+        """
+        host_overrides: host → base URL ("http://127.0.0.1:8765") its requests are sent to instead,
+        with the original host in X-Forwarded-Host (benchmarks/tests against a local stub).
+        Rate limits and metrics stay keyed by the original host.
+        """
+        self.host_rates = {**DEFAULT_HOST_RATES, **(host_rates or {})}
+        self.host_overrides = dict(host_overrides or {})
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.session = requests.Session()
+        pool = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", pool)
+        self.session.mount("http://", pool)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                rate, burst = self.host_rates.get(host, DEFAULT_RATE)
+                b = self._buckets[host] = TokenBucket(rate, burst)
+            return b
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 20, deadline: Optional[float] = None) -> requests.Response:
+        """
+        deadline: time.monotonic() after which no retry is attempted and the request timeout is
+        cut to what is left (default: the enclosing deadline_scope). The last response (or error)
+        is returned/raised as-is, except that DeadlineExceeded is raised when no rate-limit token
+        frees up before the deadline (nothing is sent) or the cut-down timeout expires.
+        """
+        deadline = deadline if deadline is not None else _deadline.get()
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        bucket = self.bucket(host)
+        override = self.host_overrides.get(host)
+        if override:
+            url = override.rstrip("/") + urlunsplit(("", "", parts.path, parts.query, ""))
+            headers = {**(headers or {}), "X-Forwarded-Host": host}
+        for attempt in range(self.max_retries + 1):
+            if not bucket.acquire(deadline):
+                raise DeadlineExceeded(f"{host}: deadline passed before the request was sent")
+            started = time.perf_counter()
+            left = None if deadline is None else deadline - time.monotonic()
+            cut = left is not None and left < timeout
+            try:
+                r = self.session.get(url, params=params, headers=headers,
+                                     timeout=max(0.001, left) if cut else timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.record_http(host, "timeout" if isinstance(e, requests.Timeout) else "error", 0,
+                                    time.perf_counter() - started)
+                if cut and isinstance(e, requests.Timeout):
+                    raise DeadlineExceeded(f"{host}: no answer before the deadline") from e
+                if attempt == self.max_retries or not self._wait(self._backoff(attempt), deadline):
+                    raise
+                continue
+            metrics.record_http(host, r.status_code, len(r.content), r.elapsed.total_seconds())
+            if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                if self._wait(min(MAX_RETRY_AFTER_S, self._retry_after(r) or self._backoff(attempt)), deadline):
+                    continue
+            return r
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _wait(seconds: float, deadline: Optional[float]) -> bool:
+        """Sleep before a retry, unless that would run past the deadline (then False: give up now)."""
+        if deadline is not None and time.monotonic() + seconds >= deadline:
+            return False
+        time.sleep(seconds)
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_s * (2 ** attempt) * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def _retry_after(r: requests.Response) -> Optional[float]:
+        value = r.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+def get_client() -> HttpClient:
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+def configure_client(client: Optional[HttpClient] = None, **kwargs) -> HttpClient:
+    """Replace the process-wide client, e.g. configure_client(host_rates={"www.sec.gov": (5, 5)})."""
+    global _default_client
+    with _default_lock:
+        _default_client = client or HttpClient(**kwargs)
+        return _default_client
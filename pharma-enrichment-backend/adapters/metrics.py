@@ -0,0 +1,157 @@
+from __future__ import annotations
+import time, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimal in-process metrics with Prometheus text exposition (no client library needed).
+# Hot paths only do a dict lookup and an add under a per-metric lock.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    s[i] += 1
+                    break
+            s[-2] += value
+            s[-1] += 1
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[float, int]]:
+        """label values → (sum, count), e.g. to diff two points in time."""
+        with self._lock:
+            return {k: (s[-2], s[-1]) for k, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(s)) for k, s in self._series.items())
+        for key, s in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, s):
+                cumulative += n
+                le = _labels(self.labelnames, key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {s[-2]:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self._metrics.append(m)
+        return m
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for m in self._metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+ADAPTER_SECONDS = REGISTRY.histogram("enrichment_adapter_call_seconds", "Adapter enrich() wall time", ["source"])
+ADAPTER_RESULTS = REGISTRY.counter(
+    "enrichment_adapter_results_total", "Adapter calls by outcome (success/empty/error/timeout/skipped)", ["source", "outcome"])
+PARSE_SECONDS = REGISTRY.histogram("enrichment_parse_seconds", "Time spent parsing source responses", ["source"])
+HTTP_REQUESTS = REGISTRY.counter("enrichment_http_requests_total", "HTTP requests sent (including retries)", ["host", "status"])
+HTTP_BYTES = REGISTRY.counter("enrichment_http_response_bytes_total", "HTTP response body bytes received", ["host"])
+HTTP_SECONDS = REGISTRY.histogram("enrichment_http_request_seconds", "HTTP request latency (excludes rate-limit waits)", ["host"])
+CACHE_LOOKUPS = REGISTRY.counter(
+    "enrichment_cache_lookups_total", "Response cache lookups (hit/revalidated/miss/offline_miss)", ["source", "result"])
+COMPANY_SECONDS = REGISTRY.histogram("enrichment_company_seconds", "End-to-end enrich_company time")
+API_CACHE_LOOKUPS = REGISTRY.counter(
+    "enrichment_api_cache_lookups_total", "/enrich result cache lookups (fresh/stale/miss/bypass)", ["result"])
+
+# Per-call timing breakdown (opt-in): the orchestrator opens a scope around each adapter call in
+# the thread running it, and the HTTP/parse/cache hooks below add to whichever scope is active.
+_breakdown: ContextVar[Optional[Dict[str, float]]] = ContextVar("enrichment_breakdown", default=None)
+
+@contextmanager
+def breakdown_scope() -> Iterator[Dict[str, float]]:
+    scope: Dict[str, float] = {}
+    token = _breakdown.set(scope)
+    try:
+        yield scope
+    finally:
+        _breakdown.reset(token)
+
+def note(key: str, amount: float = 1.0) -> None:
+    scope = _breakdown.get()
+    if scope is not None:
+        scope[key] = scope.get(key, 0.0) + amount
+
+@contextmanager
+def parse_timer(source: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PARSE_SECONDS.observe(elapsed, source=source)
+        note("parse_s", elapsed)
+
+def record_http(host: str, status: object, nbytes: int, seconds: float) -> None:
+    HTTP_REQUESTS.inc(host=host, status=str(status))
+    HTTP_BYTES.inc(nbytes, host=host)
+    HTTP_SECONDS.observe(seconds, host=host)
+    note("http_requests")
+    note("http_s", seconds)
+    note("http_bytes", nbytes)
+
+def record_cache(source: str, result: str) -> None:
+    CACHE_LOOKUPS.inc(source=source, result=result)
+    note(f"cache_{result}")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+import os, re, json, threading, unicodedata
+from typing import Dict, Iterable, List, Optional
+
+# Trailing legal-form tokens dropped before matching ("MERCK & CO INC" → "merck").
+# KGaA and "group" are deliberately absent: Merck KGaA (trading as Merck Group) and Merck & Co.
+# are different companies.
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies", "ltd", "limited",
+    "llc", "lp", "plc", "holding", "holdings", "ag", "sa", "se", "nv", "bv", "spa",
+    "gmbh", "kk", "ab", "as", "asa", "oyj", "pty",
+}
+STOPWORDS = {"and", "the"}
+
+# Built-in aliases (canonical → spellings); extend with ENRICHMENT_ALIASES_PATH (same JSON shape)
+DEFAULT_ALIASES: Dict[str, List[str]] = {
+    "Merck & Co.": ["Merck and Co", "Merck & Co., Inc.", "Merck Sharp & Dohme", "MSD"],
+    "Merck KGaA": ["Merck Group", "Merck KGaA, Darmstadt", "EMD Serono"],
+    "Johnson & Johnson": ["J&J", "Johnson and Johnson"],
+    "Bristol Myers Squibb": ["Bristol-Myers Squibb", "BMS"],
+    "GSK": ["GlaxoSmithKline", "GSK plc"],
+    "Eli Lilly": ["Eli Lilly and Company", "Lilly"],
+    "Roche": ["F. Hoffmann-La Roche", "Hoffmann-La Roche", "Roche Holding"],
+    "Takeda": ["Takeda Pharmaceutical Company"],
+    "Boehringer Ingelheim": ["Boehringer Ingelheim International"],
+}
+ALIASES_PATH = os.environ.get("ENRICHMENT_ALIASES_PATH")
+
+def normalize_company_name(name: str) -> str:
+    """Case/punctuation/accent folding plus legal-suffix stripping; the join key for company names."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii").lower()
+    tokens = [t for t in re.findall(r"[a-z0-9]+", text.replace("&", " and ")) if t not in STOPWORDS]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+class NameResolver:
+    """
+    Maps any spelling of a company to one entity: key() is the normalized alias-resolved key,
+    canonical() the spelling to enrich with (alias-table canonical, else the name itself).
+    """
+
+    def __init__(self, aliases: Optional[Dict[str, Iterable[str]]] = None, aliases_path: Optional[str] = ALIASES_PATH):
+        self._lock = threading.Lock()
+        self._alias_to_key: Dict[str, str] = {}
+        self._canonical: Dict[str, str] = {}
+        self.add_aliases(DEFAULT_ALIASES)
+        if aliases_path and os.path.exists(aliases_path):
+            with open(aliases_path) as f:
+                self.add_aliases(json.load(f))
+        if aliases:
+            self.add_aliases(aliases)
+
+    def add_aliases(self, aliases: Dict[str, Iterable[str]]) -> None:
+        with self._lock:
+            for canonical, spellings in aliases.items():
+                key = normalize_company_name(canonical)
+                self._canonical[key] = canonical
+                for s in [canonical, *spellings]:
+                    self._alias_to_key[normalize_company_name(s)] = key
+
+    def key(self, name: str) -> str:
+        norm = normalize_company_name(name)
+        return self._alias_to_key.get(norm, norm)
+
+    def canonical(self, name: str) -> str:
+        return self._canonical.get(self.key(name), name)
+
+    def index_products(self, products_by_company: Dict[str, list]) -> Dict[str, list]:
+        """Re-key products_by_company by entity, merging lists filed under different spellings."""
+        out: Dict[str, list] = {}
+        for name, products in products_by_company.items():
+            if products:
+                out.setdefault(self.key(name), []).extend(products)
+        return out
+
+_default_resolver: Optional[NameResolver] = None
+
+def get_resolver() -> NameResolver:
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = NameResolver()
+    return _default_resolver
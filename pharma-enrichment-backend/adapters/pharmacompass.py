@@ -1,48 +1,139 @@
 from __future__ import annotations
-import time, random
-import requests
+import re, time, threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup
+from . import metrics
 from .base import EnrichmentResult, SourceAdapter
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; EnrichmentBot/1.0)"}
 
+# Company names longer than this many tokens fall back to scanning the stored rows
+MAX_NGRAM = 6
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+@dataclass
+class _PageIndex:
+    url: str
+    # token n-gram → number of table rows containing it
+    grams: Dict[Tuple[str, ...], int] = field(default_factory=dict)
+    # normalized rows (" tok tok ") kept for names longer than MAX_NGRAM
+    rows: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_html(cls, url: str, html: str) -> "_PageIndex":
+        idx = cls(url)
+        soup = BeautifulSoup(html, "html.parser")
+        for tr in soup.select("table tr"):
+            toks = _tokens(tr.get_text(" ", strip=True))
+            if not toks:
+                continue
+            idx.rows.append(" " + " ".join(toks) + " ")
+            seen = set()
+            for n in range(1, MAX_NGRAM + 1):
+                for i in range(len(toks) - n + 1):
+                    seen.add(tuple(toks[i:i + n]))
+            for g in seen:
+                idx.grams[g] = idx.grams.get(g, 0) + 1
+        return idx
+
+    def count(self, name_tokens: List[str]) -> int:
+        if not name_tokens:
+            return 0
+        if len(name_tokens) <= MAX_NGRAM:
+            return self.grams.get(tuple(name_tokens), 0)
+        needle = " " + " ".join(name_tokens) + " "
+        return sum(1 for r in self.rows if needle in r)
+
 class PharmaCompassAdapter(SourceAdapter):
     """
     Stub for parsing PharmaCompass 'Top drugs by sales' compilations / company pages.
     Use to infer a proxy for marketed depth (number of notable drugs).
+    The index pages are fetched and parsed once per REFRESH_INTERVAL_S into an in-memory
+    n-gram index shared by all instances, so per-company lookups make no network calls.
     """
 
+    HOST = "www.pharmacompass.com"
+    PROVIDES = ("marketed_products_count",)
+    COST = 0.1  # lookups hit the shared in-memory index; pages are refetched about once a day
+    SOURCE = "pharmacompass"
+    CACHE_TTL = 7 * 24 * 3600  # compilations change rarely
+
     # Example index pages you might rotate through (update as you discover stable URLs):
     INDEX_PAGES = [
         "https://www.pharmacompass.com/pharma-data/top-drugs-by-sales",
         "https://www.pharmacompass.com/data-compilation"
     ]
 
-    def enrich(self, company_name: str) -> EnrichmentResult:
-        res = EnrichmentResult()
+    REFRESH_INTERVAL_S = 24 * 3600
+    RETRY_INTERVAL_S = 300  # when a page failed to load, try again sooner
+
+    _index: Optional[List[_PageIndex]] = None
+    _index_expires = 0.0
+    _index_lock = threading.Lock()
+    _index_ready = threading.Condition(_index_lock)  # signalled when a refresh finishes
+    _refreshing = False
+
+    @classmethod
+    def clear_index(cls) -> None:
+        """Drop the shared page index; the next lookup refetches the pages."""
+        with cls._index_lock:
+            cls._index, cls._index_expires = None, 0.0
+
+    def refresh_index(self, force: bool = False) -> List[_PageIndex]:
+        """
+        (Re)build the shared page index if it is missing, expired, or force=True.
+        One caller fetches and parses the pages, outside the lock; while it does, everyone else
+        keeps answering from the expired index (or waits for it, if there is none yet).
+        """
+        cls = type(self)
+        with cls._index_lock:
+            if not force and cls._index is not None and time.monotonic() < cls._index_expires:
+                return cls._index
+            if cls._refreshing:
+                if cls._index is not None and not force:
+                    return cls._index
+                cls._index_ready.wait_for(lambda: not cls._refreshing)
+                return cls._index or []
+            cls._refreshing = True
+            previous = {p.url: p for p in (cls._index or [])}
+
+        pages, errors = [], []
         try:
             for url in self.INDEX_PAGES:
-                html = requests.get(url, headers=HEADERS, timeout=30).text
-                soup = BeautifulSoup(html, "html.parser")
-                # Very naive: count top-drug rows mentioning the company
-                rows = soup.select("table tr")
-                count = 0
-                for tr in rows:
-                    t = tr.get_text(" ", strip=True)
-                    if not t: 
-                        continue
-                    if company_name.lower() in t.lower():
-                        count += 1
-                if count > 0:
-                    res.set_with_provenance(
-                        "marketed_products_count",
-                        count,  # proxy
-                        source_url=url,
-                        method="scrape",
-                        notes="Proxy count of notable drugs referencing company"
-                    )
-                    break
-                time.sleep(random.uniform(0.5, 1.0))
-            return res
-        except Exception:
-            return res
+                try:
+                    resp = self.fetch(url, headers=HEADERS, timeout=30)
+                    with metrics.parse_timer(self.SOURCE):
+                        pages.append(_PageIndex.from_html(url, resp.text))
+                except Exception as e:
+                    errors.append(e)
+                    pages.append(previous.get(url) or _PageIndex(url))
+        finally:
+            with cls._index_lock:
+                if len(pages) == len(self.INDEX_PAGES):
+                    cls._index = pages
+                    cls._index_expires = time.monotonic() + (self.RETRY_INTERVAL_S if errors else self.REFRESH_INTERVAL_S)
+                cls._refreshing = False
+                cls._index_ready.notify_all()
+        if errors and len(errors) == len(self.INDEX_PAGES) and not previous:
+            raise errors[-1]  # nothing to answer from: let the caller (and its breaker) see the outage
+        return pages
+
+    def enrich(self, company_name: str) -> EnrichmentResult:
+        res = EnrichmentResult()
+        name_tokens = _tokens(company_name)
+        for page in self.refresh_index():
+            # Very naive: count top-drug rows mentioning the company
+            count = page.count(name_tokens)
+            if count > 0:
+                res.set_with_provenance(
+                    "marketed_products_count",
+                    count,  # proxy
+                    source_url=page.url,
+                    method="scrape",
+                    notes="Proxy count of notable drugs referencing company"
+                )
+                break
+        return res
@@ -0,0 +1,202 @@
+from __future__ import annotations
+import os, json, time, sqlite3, zipfile, threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .names import get_resolver
+from .cache import DATA_DIR, snapshot_time
+
+SEC_INDEX_PATH = os.environ.get("SEC_INDEX_PATH", os.path.join(DATA_DIR, "sec_index.sqlite3"))
+
+# Revenue concepts in order of preference when several report the same fiscal period
+REVENUE_CONCEPTS = (
+    ("us-gaap", "Revenues"),
+    ("us-gaap", "RevenueFromContractWithCustomerExcludingAssessedTax"),
+    ("us-gaap", "RevenueFromContractWithCustomerIncludingAssessedTax"),
+    ("us-gaap", "SalesRevenueNet"),
+    ("us-gaap", "SalesRevenueGoodsNet"),
+    ("ifrs-full", "Revenue"),
+)
+ANNUAL_FORMS = {"10-K", "10-K/A", "20-F", "20-F/A", "40-F", "40-F/A"}
+
+def iter_archive(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the per-CIK JSON documents of a companyfacts.zip / submissions.zip (or an extracted directory)."""
+    if os.path.isdir(path):
+        for fname in sorted(os.listdir(path)):
+            if fname.endswith(".json"):
+                with open(os.path.join(path, fname), encoding="utf-8") as f:
+                    yield json.load(f)
+        return
+    with zipfile.ZipFile(path) as zf:
+        for member in zf.namelist():
+            if member.endswith(".json"):
+                with zf.open(member) as f:
+                    yield json.load(f)
+
+def _is_annual(fact: Dict[str, Any]) -> bool:
+    if fact.get("form") not in ANNUAL_FORMS or fact.get("fp") != "FY":
+        return False
+    try:
+        days = (date.fromisoformat(fact["end"]) - date.fromisoformat(fact["start"])).days
+    except (KeyError, TypeError, ValueError):
+        return False
+    return 350 <= days <= 380  # full fiscal year, not a quarter reported in the 10-K
+
+def latest_annual_revenue(companyfacts: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Most recent full-year USD revenue fact across REVENUE_CONCEPTS (latest period, then latest filing)."""
+    facts = companyfacts.get("facts") or {}
+    best, best_rank = None, None
+    for pref, (taxonomy, concept) in enumerate(REVENUE_CONCEPTS):
+        units = ((facts.get(taxonomy) or {}).get(concept) or {}).get("units") or {}
+        for fact in units.get("USD") or []:
+            if fact.get("val") is None or not _is_annual(fact):
+                continue
+            rank = (fact["end"], -pref, fact.get("filed") or "")
+            if best_rank is None or rank > best_rank:
+                best, best_rank = {**fact, "concept": f"{taxonomy}:{concept}"}, rank
+    return best
+
+def build_sec_index(companyfacts_path: str, submissions_path: Optional[str] = None,
+                    index_path: str = SEC_INDEX_PATH, as_of: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build the name/ticker → CIK → latest annual revenue store from SEC bulk archives.
+    companyfacts_path: companyfacts.zip (XBRL facts; entityName is used as the company name)
+    submissions_path: optional submissions.zip, adding tickers and former names as lookup keys
+    as_of: when companyfacts.zip was generated (epoch seconds; default: see snapshot_time)
+    """
+    resolver = get_resolver()
+    revenue: Dict[int, Tuple] = {}
+    # lookup key → (priority, cik); current names beat former names, filers with revenue beat those without
+    keys: Dict[str, Tuple[Tuple[int, int], int]] = {}
+
+    def add_key(key: str, cik: int, current: bool) -> None:
+        if not key:
+            return
+        prio = (int(current), int(cik in revenue))
+        if key not in keys or prio > keys[key][0]:
+            keys[key] = (prio, cik)
+
+    companies = 0
+    for doc in iter_archive(companyfacts_path):
+        if doc.get("cik") is None:
+            continue
+        companies += 1
+        cik, name = int(doc["cik"]), doc.get("entityName") or ""
+        fact = latest_annual_revenue(doc)
+        if fact is not None:
+            revenue[cik] = (name, float(fact["val"]), fact.get("fy"), fact["end"], fact.get("form"),
+                            fact.get("filed"), fact.get("accn"), fact["concept"])
+        add_key(resolver.key(name), cik, True)
+
+    if submissions_path:
+        for doc in iter_archive(submissions_path):
+            if doc.get("cik") is None:
+                continue
+            cik = int(doc["cik"])
+            add_key(resolver.key(doc.get("name") or ""), cik, True)
+            for former in doc.get("formerNames") or []:
+                add_key(resolver.key(former.get("name") or ""), cik, False)
+            for ticker in doc.get("tickers") or []:
+                add_key(f"ticker:{ticker.upper()}", cik, True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp = index_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    db.execute("""CREATE TABLE revenue (cik INTEGER PRIMARY KEY, name TEXT, revenue_usd REAL, fiscal_year INTEGER,
+                  period_end TEXT, form TEXT, filed TEXT, accn TEXT, concept TEXT)""")
+    db.execute("CREATE TABLE names (key TEXT PRIMARY KEY, cik INTEGER) WITHOUT ROWID")
+    db.execute("CREATE TABLE meta (k TEXT PRIMARY KEY, v TEXT)")
+    db.executemany("INSERT INTO revenue VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ((cik, *row) for cik, row in revenue.items()))
+    db.executemany("INSERT INTO names VALUES (?, ?)", ((k, cik) for k, (_, cik) in keys.items()))
+    meta = {"source": os.path.abspath(companyfacts_path), "built_at": time.time(),
+            "as_of": snapshot_time(companyfacts_path) if as_of is None else as_of,
+            "companies": companies, "with_revenue": len(revenue), "keys": len(keys)}
+    db.executemany("INSERT INTO meta VALUES (?, ?)", ((k, json.dumps(v)) for k, v in meta.items()))
+    db.commit()
+    db.close()
+    os.replace(tmp, index_path)  # readers never see a half-built index
+    return meta
+
+class SecIndex:
+    """Read side of the SEC store: indexed SQLite lookups, no network."""
+
+    def __init__(self, index_path: str = SEC_INDEX_PATH):
+        self.path = index_path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True,
+                                                                 check_same_thread=False)
+        meta = {k: json.loads(v) for k, v in self._db.execute("SELECT k, v FROM meta")}
+        self.built_at = meta.get("built_at", 0.0)
+        self.as_of = meta.get("as_of", self.built_at)  # snapshot time (older indexes: build time)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _replacement(self) -> Optional["SecIndex"]:
+        # Closed by a reload while a caller still held it: answer from the index that replaced it
+        current = get_sec_index(self.path)
+        return current if current is not self else None
+
+    def _cik(self, company: str) -> Optional[int]:
+        for key in (get_resolver().key(company), f"ticker:{company.strip().upper()}"):
+            row = self._db.execute("SELECT cik FROM names WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                return row[0]
+        return None
+
+    def cik(self, company: str) -> Optional[int]:
+        """CIK for a company name (any alias) or ticker."""
+        with self._lock:
+            if self._db is not None:
+                return self._cik(company)
+        current = self._replacement()
+        return current.cik(company) if current is not None else None
+
+    def annual_revenue(self, company: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._db is not None:
+                cik = self._cik(company)
+                if cik is None:
+                    return None
+                row = self._db.execute(
+                    "SELECT cik, name, revenue_usd, fiscal_year, period_end, form, filed, accn, concept "
+                    "FROM revenue WHERE cik = ?", (cik,)).fetchone()
+                if row is None:
+                    return None
+                keys = ("cik", "name", "revenue_usd", "fiscal_year", "period_end", "form", "filed", "accn", "concept")
+                return dict(zip(keys, row))
+        current = self._replacement()
+        return current.annual_revenue(company) if current is not None else None
+
+_index: Optional[SecIndex] = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+def get_sec_index(index_path: str = SEC_INDEX_PATH) -> Optional[SecIndex]:
+    """Shared index, reopened when the file changes; None when no archive has been ingested."""
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return None
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            previous, _index, _index_mtime = _index, SecIndex(index_path), mtime
+            if previous is not None:
+                previous.close()  # one read-only connection per rebuild otherwise stays open
+        return _index
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the local SEC revenue index from bulk archives")
+    parser.add_argument("companyfacts", help="companyfacts.zip (or extracted directory)")
+    parser.add_argument("--submissions", help="submissions.zip for tickers and former names")
+    parser.add_argument("--index", default=SEC_INDEX_PATH)
+    parser.add_argument("--as-of", help="snapshot date (YYYY-MM-DD) if the archive's own timestamps are not it")
+    args = parser.parse_args()
+    as_of = datetime.fromisoformat(args.as_of).replace(tzinfo=timezone.utc).timestamp() if args.as_of else None
+    print(json.dumps(build_sec_index(args.companyfacts, args.submissions, args.index, as_of), indent=2))
@@ -1,20 +1,47 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import json
 import sys
 import os
+import tempfile
 
 # Add the parent directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from enrichment.orchestrator import PublicEnrichmentOrchestrator
-from jobs.enrich_companies_public import enrich_companies_public
+from adapters.base import ENRICHED_FIELDS, EnrichmentResult
+from adapters.health import get_health
+from adapters import metrics
+from enrichment.orchestrator import PublicEnrichmentOrchestrator, degraded
+from jobs import export
+from jobs.enrich_companies_public import MAX_BULK_WORKERS, enrich_companies_public, iter_enrich_companies_public
+from jobs.ingest import UploadSpill
+from jobs.runner import JobRunner
+from jobs.result_store import ResultStore
+from tiering import fallback
+from api.singleflight import SingleFlight
+from api.result_cache import CachedResult, ResultCache, make_etag
+from api.shared_cache import SharedResults, make_shared_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up bulk jobs interrupted by a previous restart
+    job_runner.start(resume=True)
+    yield
+    job_runner.stop()
 
 app = FastAPI(
     title="Pharma Enrichment API",
     description="Data enrichment service for pharmaceutical companies",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow React app to call this API
@@ -26,8 +53,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the orchestrator
-orchestrator = PublicEnrichmentOrchestrator()
+# Enrichment is blocking I/O: run it on a dedicated pool so the event loop (and /health) stays responsive
+ENRICH_THREADS = int(os.environ.get("ENRICH_THREADS", "64"))
+
+# Adapters fan out concurrently under the per-company deadline (ENRICH_CONCURRENT, ENRICH_DEADLINE_S).
+# Its adapter pool has room for every /enrich thread plus one bulk run at full width, so a
+# company's calls are not left queued behind other companies' until the deadline.
+orchestrator = PublicEnrichmentOrchestrator(max_concurrency=ENRICH_THREADS + MAX_BULK_WORKERS)
+enrich_executor = ThreadPoolExecutor(max_workers=ENRICH_THREADS, thread_name_prefix="enrich-api")
+enrich_flights = SingleFlight(enrich_executor)
+
+# Final /enrich responses for hot companies: fresh for ENRICH_CACHE_TTL_S, then served stale
+# (while one background refresh runs) for up to ENRICH_CACHE_STALE_S more. Size 0 disables it.
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("ENRICH_CACHE_SIZE", "2048")),
+    ttl_s=float(os.environ.get("ENRICH_CACHE_TTL_S", "600")),
+    stale_s=float(os.environ.get("ENRICH_CACHE_STALE_S", "86400")),
+)
+_background_tasks: set = set()  # running stale refreshes (referenced so they are not collected)
+
+# Results and in-progress work shared by all worker processes on this host, so N workers asked
+# about one company scrape it once and a restarted worker starts warm. ENRICH_SHARED_CACHE:
+# sqlite (default, ENRICH_SHARED_CACHE_PATH), memory (this process only) or off.
+_shared_store = make_shared_store(os.environ.get("ENRICH_SHARED_CACHE", "sqlite"))
+shared_results = SharedResults(
+    _shared_store,
+    lease_s=float(os.environ.get("ENRICH_SHARED_LEASE_S", "120")),
+    wait_s=float(os.environ.get("ENRICH_SHARED_WAIT_S", "60")),
+    fresh_s=result_cache.ttl_s,
+) if _shared_store is not None else None
+
+# Upload bodies up to this size are spooled in memory, larger ones on disk
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", str(16 * 2**20)))
+# Larger upload bodies (as sent, i.e. before gunzip) are refused with 413
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(2 * 2**30)))
+
+# Latest result per company, kept so tiers can be recomputed without re-scraping. Thresholds
+# applied by /tiers/retier are kept there too, so every worker (and restart) tiers with them.
+result_store = ResultStore()
+fallback.use_threshold_source(result_store.thresholds)
+
+# Durable background jobs for long bulk runs (checkpointed to SQLite)
+job_runner = JobRunner(orchestrator=orchestrator, result_store=result_store, shared=shared_results)
 
 class CompanyEnrichmentRequest(BaseModel):
     company_name: str
@@ -42,27 +109,140 @@ class CompanyEnrichmentResponse(BaseModel):
     top_ta_share: Optional[float] = None
     is_global_big_pharma: Optional[bool] = None
     provenance: Dict[str, Any] = {}
+    # Only with ?timings=true: per-source timing breakdown for debugging slow companies
+    timings: Optional[Dict[str, Any]] = None
 
 class BulkEnrichmentRequest(BaseModel):
     companies: List[Dict[str, Any]]
     products_by_company: Dict[str, List[Dict[str, Any]]] = {}
+    max_workers: int = Field(4, ge=1, le=MAX_BULK_WORKERS)
+    # Incremental refresh: company_id -> previous result, plus optional per-field max age (seconds)
+    prior_results: Dict[str, Dict[str, Any]] = {}
+    max_age_s: Dict[str, float] = {}
 
 class BulkEnrichmentResponse(BaseModel):
     results: List[Dict[str, Any]]
 
+class RetierRequest(BaseModel):
+    top_ta_share_threshold: Optional[float] = None
+    platform_share_threshold: Optional[float] = None
+    # False = what-if only; True = write the new tiers (and make the thresholds current)
+    apply: bool = False
+    max_changes: int = 100
+
 @app.get("/")
 async def root():
     return {"message": "Pharma Enrichment API is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "pharma-enrichment-api"}
+    # Per-source circuit-breaker state and recent latency
+    return {"status": "healthy", "service": "pharma-enrichment-api", "sources": get_health().snapshot()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: adapter latency/outcomes, HTTP traffic per host, parse time, cache hits."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+async def _blocking(fn, *args, **kwargs):
+    """Run a blocking call (SQLite, file I/O) on the enrichment pool, off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(enrich_executor, partial(fn, *args, **kwargs))
+
+def _enrich_for_api(key, name: str, wanted: Optional[frozenset], timings: bool, max_age_s: float = 0.0):
+    """(result, timings breakdown, age_s). Without timings, workers share results and in-progress work."""
+    if timings or shared_results is None:
+        breakdown = {} if timings else None
+        return orchestrator.enrich_company(name, fields=wanted, timings=breakdown), breakdown, 0.0
+    value, age = shared_results.get_or_compute(
+        shared_results.key(*key), lambda: orchestrator.enrich_company(name, fields=wanted).to_dict(), max_age_s,
+        cacheable=lambda v: not degraded(v.get("provenance") or {}))
+    return EnrichmentResult.from_dict(value), None, age
+
+def _cache_result(key, result, age_s: float = 0.0) -> Optional[CachedResult]:
+    if degraded(result.provenance):
+        return None
+    return result_cache.put(key, result, make_etag(result.to_dict()), age_s=age_s)
+
+def _start_refresh(key, name: str, wanted: Optional[frozenset]) -> None:
+    if result_cache.begin_refresh(key):
+        task = asyncio.create_task(_refresh_cached(key, name, wanted))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+async def _refresh_cached(key, name: str, wanted: Optional[frozenset]) -> None:
+    try:
+        # Only a fresh result will do: another worker's if it refreshed already, else scrape
+        result, _, age = await enrich_flights.do((*key, False, "refresh"), _enrich_for_api, key, name, wanted,
+                                                 False, result_cache.ttl_s)
+        _cache_result(key, result, age)
+    except Exception:
+        pass  # keep serving the stale entry; the next request retries
+    finally:
+        result_cache.end_refresh(key)
+
+def _response_etag(company_name: str, result_etag: str) -> str:
+    """The response echoes the requested spelling, so its ETag covers that as well as the shared result."""
+    return make_etag([company_name, result_etag])
+
+def _not_modified(http_request: Request, etag: str) -> bool:
+    tags = http_request.headers.get("if-none-match")
+    if not tags:
+        return False
+    return tags.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in tags.split(","))
 
 @app.post("/enrich", response_model=CompanyEnrichmentResponse)
-async def enrich_single_company(request: CompanyEnrichmentRequest):
-    """Enrich a single company with data from multiple sources"""
+async def enrich_single_company(request: CompanyEnrichmentRequest, http_request: Request, response: Response,
+                                fields: Optional[str] = None, timings: bool = False):
+    """
+    Enrich a single company with data from multiple sources.
+    fields: optional comma-separated subset (e.g. ?fields=annual_revenue_usd); only the
+    sources needed for those fields are called.
+    timings: include a per-source timing breakdown in the response (bypasses the result cache).
+    Responses carry an ETag; a matching If-None-Match gets 304.
+    """
+    wanted = None
+    if fields:
+        wanted = frozenset(f.strip() for f in fields.split(",") if f.strip())
+        unknown = wanted.difference(ENRICHED_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
     try:
-        result = orchestrator.enrich_company(request.company_name)
+        # Concurrent requests for the same company (under any spelling) share one enrichment
+        resolver = orchestrator.resolver
+        key = (resolver.key(request.company_name), wanted)
+        name = resolver.canonical(request.company_name)
+        breakdown = None
+        if timings:
+            metrics.API_CACHE_LOOKUPS.inc(result="bypass")
+            entry, state = None, "bypass"
+        else:
+            entry, state = result_cache.get(key)
+            metrics.API_CACHE_LOOKUPS.inc(result=state)
+
+        if entry is not None:
+            result = entry.value
+        else:
+            # Anything within the stale window will do here (e.g. another worker's result)
+            result, breakdown, age = await enrich_flights.do(
+                (*key, timings), _enrich_for_api, key, name, wanted, timings, result_cache.ttl_s + result_cache.stale_s)
+            if not timings:
+                entry = _cache_result(key, result, age)
+                if entry is not None and age > 0:
+                    state = "shared" if age < result_cache.ttl_s else "stale"
+        if state == "stale":
+            _start_refresh(key, name, wanted)
+
+        if entry is not None:
+            etag = _response_etag(request.company_name, entry.etag)
+            cache_control = f"max-age={result_cache.max_age(entry)}, stale-while-revalidate={int(result_cache.stale_s)}"
+        else:
+            etag = _response_etag(request.company_name, make_etag(result.to_dict()))
+            cache_control = "no-cache"
+
+        headers = {"ETag": etag, "Cache-Control": cache_control, "X-Cache": state}
+        if _not_modified(http_request, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
         
         return CompanyEnrichmentResponse(
             company_name=request.company_name,
@@ -73,7 +253,8 @@ async def enrich_single_company(request: CompanyEnrichmentRequest):
             top_ta=result.top_ta,
             top_ta_share=result.top_ta_share,
             is_global_big_pharma=result.is_global_big_pharma,
-            provenance=result.provenance
+            provenance=result.provenance,
+            timings=breakdown
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Enrichment failed: {str(e)}")
@@ -82,18 +263,191 @@ async def enrich_single_company(request: CompanyEnrichmentRequest):
 async def enrich_multiple_companies(request: BulkEnrichmentRequest):
     """Enrich multiple companies with tiering logic"""
     try:
-        results = enrich_companies_public(
+        results = await asyncio.get_running_loop().run_in_executor(enrich_executor, partial(
+            enrich_companies_public,
             companies=request.companies,
-            products_by_company=request.products_by_company
-        )
-        
+            products_by_company=request.products_by_company,
+            max_workers=request.max_workers,
+            orchestrator=orchestrator,
+            prior_results=request.prior_results,
+            max_age=request.max_age_s or None,
+            shared=shared_results
+        ))
+        await _blocking(result_store.upsert, results)
+
         return BulkEnrichmentResponse(results=results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Bulk enrichment failed: {str(e)}")
 
+@app.post("/enrich/bulk/stream")
+async def enrich_multiple_companies_stream(request: BulkEnrichmentRequest, format: str = "ndjson"):
+    """
+    Streaming variant of /enrich/bulk: each company's result is sent as soon as it completes
+    (completion order, keyed by company_id). format=ndjson (one JSON object per line) or
+    format=sse (server-sent events, terminated by an "end" event).
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    results = iter_enrich_companies_public(
+        companies=request.companies,
+        products_by_company=request.products_by_company,
+        max_workers=request.max_workers,
+        orchestrator=orchestrator,
+        return_exceptions=True,
+        prior_results=request.prior_results,
+        max_age=request.max_age_s or None,
+        shared=shared_results
+    )
+
+    return _stream_results(results, format)
+
+def _stream_results(results, format: str, on_close=None) -> StreamingResponse:
+    """
+    Store and stream payloads as NDJSON or SSE. on_close runs once the response is done, also
+    when the stream was never iterated or the client went away (it may be called twice).
+    """
+    def stored():
+        try:
+            for r in results:
+                result_store.upsert([r])
+                yield r
+        finally:
+            if on_close is not None:
+                on_close()
+
+    def ndjson():
+        for r in stored():
+            yield json.dumps(r) + "\n"
+
+    def sse():
+        for r in stored():
+            yield f"event: result\ndata: {json.dumps(r)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+
+    cleanup = BackgroundTask(on_close) if on_close is not None else None
+    if format == "sse":
+        return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                                 background=cleanup)
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", background=cleanup)
+
+async def _ingest_upload(request: Request) -> UploadSpill:
+    """
+    Spool the request body (memory up to UPLOAD_SPOOL_BYTES, then disk) and load it into an
+    UploadSpill. Bodies over MAX_UPLOAD_BYTES get 413, from Content-Length when sent.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise too_large
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    try:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise too_large
+            spool.write(chunk)
+        spool.seek(0)
+        return await asyncio.get_running_loop().run_in_executor(enrich_executor, partial(
+            UploadSpill.from_upload, spool, request.headers.get("content-type", ""),
+            request.headers.get("content-encoding", ""), orchestrator.resolver))
+    except RuntimeError as e:  # pyarrow missing
+        raise HTTPException(status_code=501, detail=str(e))
+    except (ValueError, OSError, EOFError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable upload: {e}")
+    finally:
+        spool.close()
+
+@app.post("/enrich/bulk/upload")
+async def enrich_uploaded_companies(request: Request, max_workers: int = Query(4, ge=1, le=MAX_BULK_WORKERS),
+                                    format: str = "ndjson"):
+    """
+    /enrich/bulk/stream for large inputs sent as a file body: NDJSON (optionally gzip'd), Arrow
+    IPC or Parquet rows of companies and products, joined by company (see jobs/ingest.py).
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    spill = await _ingest_upload(request)
+    results = iter_enrich_companies_public(
+        companies=spill.companies(),
+        products_by_company=spill.products,
+        max_workers=max_workers,
+        orchestrator=orchestrator,
+        return_exceptions=True,
+        prior_results=spill.priors,
+        products_keyed=True,
+        shared=shared_results
+    )
+    return _stream_results(results, format, on_close=spill.close)
+
+@app.post("/jobs", status_code=202)
+async def submit_enrichment_job(request: BulkEnrichmentRequest):
+    """Queue a bulk enrichment job; poll /jobs/{job_id} for progress"""
+    job_id = await _blocking(job_runner.submit, request.companies, request.products_by_company, request.max_workers,
+                             prior_results=request.prior_results, max_age=request.max_age_s or None)
+    return await _blocking(job_runner.store.get, job_id)
+
+@app.post("/jobs/upload", status_code=202)
+async def submit_uploaded_enrichment_job(request: Request, max_workers: int = Query(4, ge=1, le=MAX_BULK_WORKERS)):
+    """Queue a bulk job from a file body (same formats as /enrich/bulk/upload)"""
+    spill = await _ingest_upload(request)
+    try:
+        job_id = await _blocking(job_runner.submit, spill.companies(), spill.products, max_workers,
+                                 prior_results=spill.priors, products_keyed=True)
+    finally:
+        spill.close()
+    return await _blocking(job_runner.store.get, job_id)
+
+@app.get("/jobs/{job_id}")
+async def get_enrichment_job(job_id: str):
+    """Status and progress of a bulk enrichment job"""
+    job = await _blocking(job_runner.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/results")
+async def get_enrichment_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """Page through a job's finished results, in input order"""
+    job = await _blocking(job_runner.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    limit = max(1, min(limit, 1000))
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "offset": offset,
+        "limit": limit,
+        "done": job["done"],
+        "total": job["total"],
+        "results": await _blocking(job_runner.store.results, job_id, offset=offset, limit=limit)
+    }
+
+@app.get("/jobs/{job_id}/export")
+async def export_enrichment_job_results(job_id: str, format: str = "parquet"):
+    """All finished results of a job as one columnar file: format=parquet or arrow (IPC stream)"""
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.EXPORT_FORMATS)}")
+    if export.pa is None:
+        raise HTTPException(status_code=501, detail="Columnar export needs pyarrow on the server")
+    if await _blocking(job_runner.store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    suffix = ".parquet" if format == "parquet" else ".arrows"
+    fd, path = tempfile.mkstemp(prefix=f"export-{job_id}-", suffix=suffix)
+    os.close(fd)
+    try:
+        await _blocking(export.write_results, job_runner.store.iter_results(job_id), path, format)
+    except Exception:
+        os.remove(path)
+        raise
+    return FileResponse(path, media_type=export.EXPORT_FORMATS[format], filename=f"{job_id}{suffix}",
+                        background=BackgroundTask(os.remove, path))
+
 @app.get("/tiers")
 async def get_tier_definitions():
     """Get the tier definitions and thresholds"""
+    thresholds, stored = await _blocking(lambda: (fallback.current_thresholds(), result_store.count()))
     return {
         "tiers": {
             "TIER_1": "Big Pharma - Global scale with significant revenue and late-stage assets",
@@ -103,12 +457,21 @@ async def get_tier_definitions():
             "MID_TIER": "Mid-Tier - Established companies with some commercial presence",
             "UNCLASSIFIED": "Unclassified - Companies that don't fit other categories"
         },
-        "thresholds": {
-            "top_ta_share_threshold": 0.60,
-            "platform_share_threshold": 0.70
-        }
+        "thresholds": thresholds,
+        "stored_companies": stored
     }
 
+@app.post("/tiers/retier")
+async def retier_stored_companies(request: RetierRequest):
+    """
+    Recompute assigned_tier for every stored company from its stored features (no scraping).
+    Omitted thresholds use the current ones. With apply=false this is a what-if preview; with
+    apply=true the thresholds are stored with the tiers and become current in every worker.
+    """
+    return await _blocking(result_store.retier, top_ta_share_thresh=request.top_ta_share_threshold,
+                           platform_share_thresh=request.platform_share_threshold,
+                           apply=request.apply, max_changes=request.max_changes)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
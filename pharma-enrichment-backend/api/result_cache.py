@@ -0,0 +1,84 @@
+from __future__ import annotations
+import hashlib, json, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional, Tuple
+
+@dataclass
+class CachedResult:
+    value: Any
+    etag: str
+    stored_at: float
+    refreshing: bool = False
+
+def make_etag(body: Any) -> str:
+    """Strong ETag for a JSON-serializable response body."""
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+class ResultCache:
+    """
+    Bounded LRU of final responses with stale-while-revalidate:
+    age < ttl_s → "fresh"; age < ttl_s + stale_s → "stale" (serve it, refresh in the
+    background); older → a miss. begin_refresh() lets exactly one caller refresh a stale entry.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_s: float = 600.0, stale_s: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self._entries: "OrderedDict[Hashable, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Tuple[Optional[CachedResult], str]:
+        """(entry, "fresh" | "stale" | "miss")"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, "miss"
+            age = now - entry.stored_at
+            if age >= self.ttl_s + self.stale_s:
+                del self._entries[key]
+                return None, "miss"
+            self._entries.move_to_end(key)
+            return entry, "fresh" if age < self.ttl_s else "stale"
+
+    def put(self, key: Hashable, value: Any, etag: str, age_s: float = 0.0) -> CachedResult:
+        """age_s: how old the value already is (e.g. taken from a cache shared with other workers)."""
+        entry = CachedResult(value, etag, time.monotonic() - age_s)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """True for the one caller that should refresh this (stale) entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refreshing:
+                return False
+            entry.refreshing = True
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def max_age(self, entry: CachedResult, now: Optional[float] = None) -> int:
+        """Seconds of freshness left, for Cache-Control."""
+        now = time.monotonic() if now is None else now
+        return max(0, int(self.ttl_s - (now - entry.stored_at)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
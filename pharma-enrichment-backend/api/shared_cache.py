@@ -0,0 +1,234 @@
+from __future__ import annotations
+import json, os, socket, sqlite3, threading, time, uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from adapters.cache import DATA_DIR
+
+SHARED_CACHE_PATH = os.environ.get("ENRICH_SHARED_CACHE_PATH", os.path.join(DATA_DIR, "shared_results.sqlite3"))
+
+class SharedStore:
+    """
+    Results and work leases shared by every API worker. Backends: SQLiteSharedStore (all
+    processes on one host) and MemorySharedStore (one process; the stand-in for a networked
+    backend such as Redis, which would implement these five methods).
+    Values are JSON-serializable dicts; ages are wall-clock seconds.
+    """
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(value, age_s) or None."""
+        raise NotImplementedError
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def acquire(self, key: str, owner: str, lease_s: float) -> bool:
+        """Take the work lease for `key`; False while another owner holds an unexpired one."""
+        raise NotImplementedError
+
+    def renew(self, key: str, owner: str, lease_s: float) -> bool:
+        """Extend a lease `owner` holds; False if it lapsed and someone else took it."""
+        raise NotImplementedError
+
+    def release(self, key: str, owner: str) -> None:
+        raise NotImplementedError
+
+class MemorySharedStore(SharedStore):
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            hit = self._results.get(key)
+        if hit is None:
+            return None
+        # Stored as JSON so callers never share (and mutate) one dict, as with a real backend
+        return json.loads(hit[0]), time.time() - hit[1]
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = (json.dumps(value), time.time())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def acquire(self, key: str, owner: str, lease_s: float) -> bool:
+        now = time.time()
+        with self._lock:
+            held = self._leases.get(key)
+            if held is not None and held[1] > now:
+                return False
+            self._leases[key] = (owner, now + lease_s)
+            return True
+
+    def renew(self, key: str, owner: str, lease_s: float) -> bool:
+        with self._lock:
+            if self._leases.get(key, ("",))[0] != owner:
+                return False
+            self._leases[key] = (owner, time.time() + lease_s)
+            return True
+
+    def release(self, key: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(key, ("",))[0] == owner:
+                del self._leases[key]
+
+class SQLiteSharedStore(SharedStore):
+    """
+    One SQLite file (WAL) opened by every worker process: results are visible to all of them
+    as soon as they are committed, and leases are taken in BEGIN IMMEDIATE transactions so
+    exactly one process wins. Entries older than `retention_s` are pruned as new ones arrive.
+    """
+
+    PRUNE_EVERY = 256  # puts between prunes
+
+    def __init__(self, path: str = SHARED_CACHE_PATH, retention_s: float = 7 * 86400.0):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.retention_s = retention_s
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._connect()
+
+    def _connect(self) -> None:
+        self._pid = os.getpid()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+        """)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # A connection must not cross fork() (e.g. gunicorn --preload): each worker opens its own
+        if self._pid != os.getpid():
+            self._connect()
+        return self._db
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            row = self.db.execute("SELECT value, stored_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            db = self.db
+            db.execute("INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(value), now))
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                db.execute("DELETE FROM results WHERE stored_at < ?", (now - self.retention_s,))
+                db.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+
+    def acquire(self, key: str, owner: str, lease_s: float) -> bool:
+        now = time.time()
+        with self._lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+                taken = db.execute("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                                   (key, owner, now + lease_s)).rowcount == 1
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return taken
+
+    def renew(self, key: str, owner: str, lease_s: float) -> bool:
+        with self._lock:
+            return self.db.execute("UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                                   (time.time() + lease_s, key, owner)).rowcount == 1
+
+    def release(self, key: str, owner: str) -> None:
+        with self._lock:
+            self.db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+def make_shared_store(kind: str, path: str = SHARED_CACHE_PATH) -> Optional[SharedStore]:
+    """Backend by name: sqlite, memory, or off (no shared cache)."""
+    kind = (kind or "off").strip().lower()
+    if kind in ("off", "none", "0"):
+        return None
+    if kind == "memory":
+        return MemorySharedStore()
+    if kind == "sqlite":
+        return SQLiteSharedStore(path)
+    raise ValueError(f"Unknown shared cache backend: {kind}")
+
+class SharedResults:
+    """
+    Cross-process get-or-compute: a result younger than max_age_s is taken from the store;
+    otherwise one worker takes the lease and computes while the others poll for its result.
+    lease_s: how long a lease outlives a crashed holder (it is renewed while the holder computes)
+    wait_s: how long a worker waits for another's result before computing it itself
+    fresh_s: default max_age_s
+    degraded_ttl_s: how long a non-cacheable result (e.g. a source was down) is handed to
+                    other callers, so an outage does not make every worker re-scrape in turn
+    """
+
+    def __init__(self, store: SharedStore, lease_s: float = 120.0, wait_s: float = 60.0, poll_s: float = 0.05,
+                 fresh_s: float = 600.0, degraded_ttl_s: float = 30.0):
+        self.store = store
+        self.lease_s = lease_s
+        self.wait_s = wait_s
+        self.poll_s = poll_s
+        self.fresh_s = fresh_s
+        self.degraded_ttl_s = degraded_ttl_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def key(entity_key: str, fields: Optional[Any] = None) -> str:
+        """Store key of an enrichment of `entity_key` (NameResolver.key) for `fields` (None = all)."""
+        return f"{entity_key}|{','.join(sorted(fields)) if fields else '*'}"
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]], max_age_s: Optional[float] = None,
+                       cacheable: Callable[[Dict[str, Any]], bool] = lambda v: True) -> Tuple[Dict[str, Any], float]:
+        """(value, age_s); age_s is 0 when this call computed it."""
+        max_age_s = self.fresh_s if max_age_s is None else max_age_s
+        degraded_key = f"{key}#degraded"  # kept apart so it never replaces a good (if stale) result
+        deadline = time.monotonic() + self.wait_s
+        owner = f"{self.owner}:{uuid.uuid4().hex[:8]}"  # per call: threads of one process exclude each other too
+        while True:
+            hit = self.store.get(key)
+            if hit is not None and hit[1] < max_age_s:
+                return hit
+            hit = self.store.get(degraded_key)
+            if hit is not None and hit[1] < min(max_age_s, self.degraded_ttl_s):
+                return hit
+            if self.store.acquire(key, owner, self.lease_s):
+                try:
+                    with self._renewing(key, owner):
+                        value = compute()
+                    self.store.put(key if cacheable(value) else degraded_key, value)
+                    return value, 0.0
+                finally:
+                    self.store.release(key, owner)
+            if time.monotonic() >= deadline:
+                return compute(), 0.0  # the lease holder is stuck: don't make this caller wait longer
+            time.sleep(self.poll_s)
+
+    @contextmanager
+    def _renewing(self, key: str, owner: str):
+        """Keep the lease alive for as long as the block runs (retries can outlast lease_s)."""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease_s / 3):
+                if not self.store.renew(key, owner, self.lease_s):
+                    return
+
+        thread = threading.Thread(target=renew, name="shared-lease", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Run blocking calls off the event loop and coalesce concurrent calls for the same key:
+    while one call for `key` is in flight, later callers await the same result instead of
+    starting their own.
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self.executor, fn, *args)
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+        # shield: one client disconnecting must not cancel the call the others are waiting on
+        return await asyncio.shield(fut)
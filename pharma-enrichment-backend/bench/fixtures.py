@@ -0,0 +1,138 @@
+from __future__ import annotations
+import json, re, sqlite3, zipfile, zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# A response as the stub server sends it: (status, headers, body)
+Response = Tuple[int, Dict[str, str], bytes]
+
+def _n(name: str, mod: int) -> int:
+    """Stable per-company number (same on every run and Python version)."""
+    return zlib.crc32(name.encode()) % mod
+
+class SyntheticSources:
+    """
+    Deterministic stand-ins for every live source, shaped like the pages/APIs the adapters parse.
+    n_companies: universe size ("Benchco 0000 Pharma" ...)
+    list_share: fraction of companies on the CompaniesMarketCap list page (the rest need a search)
+    page_kb: padding per HTML page so parse cost is in the range of the real sites
+    """
+
+    def __init__(self, n_companies: int = 500, list_share: float = 0.7, page_kb: int = 60):
+        self.names = [f"Benchco {i:04d} Pharma" for i in range(n_companies)]
+        self.list_share = list_share
+        self.page_kb = page_kb
+        self._slug = {self._slugify(n): n for n in self.names}
+        self._padding = self._make_padding(page_kb)
+
+    @staticmethod
+    def _slugify(name: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+    @staticmethod
+    def _make_padding(kb: int) -> str:
+        row = '<div class="row"><span class="k">metric</span><span class="v">1,234.5</span></div>'
+        return "".join(row for _ in range(kb * 1024 // len(row)))
+
+    def _html(self, body: str) -> Response:
+        page = f"<html><head><title>bench</title></head><body>{body}{self._padding}</body></html>"
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, page.encode()
+
+    def respond(self, host: str, path: str, query: str) -> Optional[Response]:
+        if host == "companiesmarketcap.com":
+            return self._cmc(path, query)
+        if host == "www.pharmacompass.com":
+            return self._pharmacompass(path)
+        if host == "clinicaltrials.gov":
+            return self._clinicaltrials(query)
+        return None
+
+    def _cmc(self, path: str, query: str) -> Optional[Response]:
+        if path.startswith("/pharmaceuticals/"):
+            listed = self.names[: int(len(self.names) * self.list_share)]
+            rows = "".join(f'<a href="/{self._slugify(n)}/marketcap/"><div class="company-name">{n}</div>'
+                           f'<div class="company-code">BC{i:04d}</div></a>' for i, n in enumerate(listed))
+            return self._html(rows)
+        if path.startswith("/search/"):
+            q = parse_qs(query).get("q", [""])[0]
+            slug = self._slugify(q)
+            return self._html(f'<a href="/{slug}/revenue/">{q}</a>' if slug in self._slug else "No results")
+        m = re.match(r"^/([^/]+)/revenue/$", path)
+        if m and m.group(1) in self._slug:
+            name = self._slug[m.group(1)]
+            revenue = 0.5 + _n(name, 600) / 10
+            return self._html(f"<h1>{name}</h1><p>Revenue for {name} (TTM): ${revenue:.1f} billion TTM</p>")
+        return None
+
+    def _pharmacompass(self, path: str) -> Response:
+        offset = 0 if "top-drugs" in path else 1
+        rows = []
+        for i, name in enumerate(self.names[offset::2]):
+            for j in range(_n(name, 6)):
+                rows.append(f"<tr><td>Drug-{i}-{j}</td><td>{name}</td><td>${1 + j}.0B</td></tr>")
+        return self._html("<table>" + "".join(rows) + "</table>")
+
+    def _clinicaltrials(self, query: str) -> Response:
+        expr = parse_qs(query).get("expr", [""])[0]
+        m = re.search(r"Sponsor/(.*?)\)", expr)
+        name = m.group(1) if m else ""
+        n = _n(name, 40) if name in self.names else 0
+        studies = [{"NCTId": [f"NCT{_n(name, 10**8):08d}{k}"], "Phase": ["Phase 3" if k % 3 else "Phase 4"],
+                    "OverallStatus": ["Recruiting" if k % 2 else "Completed"]} for k in range(n)]
+        body = json.dumps({"StudyFieldsResponse": {"NStudiesFound": n, "StudyFields": studies}}).encode()
+        return 200, {"Content-Type": "application/json"}, body
+
+    def write_companyfacts_zip(self, path: str, share: float = 0.5) -> None:
+        """SEC companyfacts archive for about `share` of the companies (the rest fall back to CMC)."""
+        with zipfile.ZipFile(path, "w") as zf:
+            for i, name in enumerate(self.names):
+                if _n(name + "/sec", 1000) >= share * 1000:
+                    continue
+                fact = {"val": (1 + _n(name, 500)) * 1e8, "start": "2024-01-01", "end": "2024-12-31", "fy": 2024,
+                        "fp": "FY", "form": "10-K", "filed": "2025-02-15", "accn": f"0000{i:06d}-25-000001"}
+                doc = {"cik": 900000 + i, "entityName": name, "facts": {"us-gaap": {"Revenues": {"units": {"USD": [fact]}}}}}
+                zf.writestr(f"CIK{900000 + i:010d}.json", json.dumps(doc))
+
+class RecordedSources:
+    """Replays responses recorded in a ResponseCache database (e.g. .data/http_cache.sqlite3 after a live run)."""
+
+    def __init__(self, cache_path: str):
+        self._responses: Dict[str, Response] = {}
+        db = sqlite3.connect(f"file:{cache_path}?mode=ro", uri=True)
+        try:
+            for url, status, headers, body in db.execute("SELECT url, status, headers, body FROM responses"):
+                keep = {k: v for k, v in json.loads(headers or "{}").items() if k.lower() == "content-type"}
+                self._responses[self._key(url)] = (status, keep, body)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.hostname}{parts.path}?{parts.query}"
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def respond(self, host: str, path: str, query: str) -> Optional[Response]:
+        return self._responses.get(f"{host}{path}?{query}")
+
+class ChainedSources:
+    """First source with an answer wins (recorded responses, then synthetic ones)."""
+
+    def __init__(self, *sources):
+        self.sources = sources
+
+    def respond(self, host: str, path: str, query: str) -> Optional[Response]:
+        for s in self.sources:
+            r = s.respond(host, path, query)
+            if r is not None:
+                return r
+        return None
+
+    @property
+    def names(self) -> List[str]:
+        for s in self.sources:
+            if hasattr(s, "names"):
+                return s.names
+        return []
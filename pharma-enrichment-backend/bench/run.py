@@ -0,0 +1,134 @@
+"""
+Offline benchmark: every source is replaced by a local stub server (synthetic pages, or
+responses replayed from a response-cache database), so runs are reproducible and comparable.
+
+    python -m bench.run --out bench-results.json
+    python -m bench.run --latency 0.05 --failure-rate 0.1 --out slow.json --compare bench-results.json
+"""
+from __future__ import annotations
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Local stores that must not touch the user's .data during a run
+_STORE_ENV = ("ENRICHMENT_CACHE_PATH", "CMC_SLUG_TABLE_PATH", "CTGOV_INDEX_PATH", "SEC_INDEX_PATH",
+              "ENRICHMENT_JOBS_PATH", "ENRICHMENT_RESULTS_PATH", "ENRICH_SHARED_CACHE_PATH")
+
+def _ints(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, float, float, float]]:
+    """Metrics that got worse by more than `threshold` (relative). *_per_s is higher-is-better, the rest lower."""
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        if scenario not in baseline.get("scenarios", {}):
+            continue
+        now, base = _flatten(result), _flatten(baseline["scenarios"][scenario])
+        for key, value in now.items():
+            old = base.get(key)
+            if not old or key.endswith("count") or key in ("companies", "http_requests"):
+                continue
+            change = (value - old) / old
+            worse = -change if key.endswith("per_s") else change
+            if worse > threshold:
+                regressions.append((f"{scenario}.{key}", old, value, change))
+    return regressions
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline enrichment benchmark against a local stub of every source")
+    parser.add_argument("--companies", type=int, default=100, help="companies for the orchestrator/API scenarios")
+    parser.add_argument("--universe", type=int, default=500, help="synthetic companies served by the stub")
+    parser.add_argument("--batch-sizes", type=_ints, default=[50, 200])
+    parser.add_argument("--workers", type=_ints, default=[1, 8, 32])
+    parser.add_argument("--scenarios", default="orchestrator,bulk,api")
+    parser.add_argument("--latency", type=float, default=0.02, help="injected per-request latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of an injected 503")
+    parser.add_argument("--page-kb", type=int, default=60, help="HTML page size, drives parse cost")
+    parser.add_argument("--replay", help="ResponseCache database whose recorded responses are served first")
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--real-rate-limits", action="store_true", help="keep the per-host token buckets")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    # Isolate every local store in a scratch directory before the project modules read their paths
+    data_dir = tempfile.mkdtemp(prefix="enrichment-bench-")
+    os.environ["ENRICHMENT_DATA_DIR"] = data_dir
+    for name in _STORE_ENV:
+        os.environ.pop(name, None)
+    sys.path.insert(0, BACKEND_DIR)
+
+    from bench.fixtures import ChainedSources, RecordedSources, SyntheticSources
+    from bench.stub_server import StubServer
+    from bench import scenarios
+
+    synthetic = SyntheticSources(args.universe, page_kb=args.page_kb)
+    sources = ChainedSources(RecordedSources(args.replay), synthetic) if args.replay else synthetic
+    scenarios.prepare_sec_index(synthetic, data_dir)
+    selected = set(args.scenarios.split(","))
+
+    with StubServer(sources, latency_s={"*": args.latency}, jitter_s=args.jitter,
+                    failure_rate={"*": args.failure_rate}, seed=args.seed) as stub:
+        ctx = scenarios.BenchContext(stub=stub, names=synthetic.names, max_retries=args.retries,
+                                     real_rate_limits=args.real_rate_limits, memory=not args.no_memory)
+        n = min(args.companies, args.universe)
+        if "orchestrator" in selected:
+            for concurrent in (False, True):
+                r = scenarios.bench_orchestrator(ctx, n, concurrent)
+                print(f"orchestrator {'concurrent' if concurrent else 'serial':10s} {r['companies_per_s']:8.1f} companies/s")
+        if "bulk" in selected:
+            for batch in args.batch_sizes:
+                for workers in args.workers:
+                    r = scenarios.bench_bulk(ctx, min(batch, args.universe), workers)
+                    print(f"bulk batch={batch:<5d} workers={workers:<3d} {r['companies_per_s']:8.1f} companies/s")
+        if "api" in selected:
+            scenarios.bench_api(ctx, n, min(max(args.batch_sizes), args.universe), max(args.workers))
+            for name in ctx.results:
+                if name.startswith("api_"):
+                    print(f"{name:30s} {ctx.results[name]['companies_per_s']:8.1f} companies/s")
+
+    report = {
+        "meta": {"git_rev": _git_rev(), "python": platform.python_version(), "platform": platform.platform(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                 "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}},
+        "scenarios": ctx.results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for key, old, new, change in regressions:
+            print(f"REGRESSION {key}: {old:g} -> {new:g} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} vs {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
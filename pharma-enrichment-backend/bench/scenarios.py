@@ -0,0 +1,143 @@
+from __future__ import annotations
+import gc, os, time, tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from adapters import metrics
+from adapters.cache import configure_cache
+from adapters.companies_marketcap import CompaniesMarketCapAdapter, SlugTable, SLUG_TABLE_PATH
+from adapters.health import configure_health
+from adapters.http_client import configure_client
+from adapters.pharmacompass import PharmaCompassAdapter
+from adapters.sec_index import SEC_INDEX_PATH, build_sec_index
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+from jobs.enrich_companies_public import enrich_companies_public
+from bench.stub_server import StubServer
+
+SOURCE_HOSTS = ("companiesmarketcap.com", "www.pharmacompass.com", "clinicaltrials.gov", "www.sec.gov")
+
+@dataclass
+class BenchContext:
+    stub: StubServer
+    names: List[str]
+    max_retries: int = 1
+    backoff_s: float = 0.05
+    real_rate_limits: bool = False
+    memory: bool = True
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+def prepare_sec_index(sources, data_dir: str) -> None:
+    """Filed revenue for part of the universe, so EDGAR answers locally and CMC covers the rest."""
+    archive = os.path.join(data_dir, "bench_companyfacts.zip")
+    sources.write_companyfacts_zip(archive)
+    build_sec_index(archive, index_path=SEC_INDEX_PATH)
+
+def reset(ctx: BenchContext) -> None:
+    """Cold start for every scenario: empty response cache, slug table, page index and breakers."""
+    configure_cache(path=":memory:")
+    rates = None if ctx.real_rate_limits else {h: (1e6, 1e6) for h in SOURCE_HOSTS}
+    configure_client(host_rates=rates, max_retries=ctx.max_retries, backoff_s=ctx.backoff_s,
+                     pool_maxsize=64, host_overrides=ctx.stub.overrides(SOURCE_HOSTS))
+    configure_health()
+    if os.path.exists(SLUG_TABLE_PATH):
+        os.remove(SLUG_TABLE_PATH)
+    CompaniesMarketCapAdapter.use_slug_table(SlugTable())
+    PharmaCompassAdapter.clear_index()
+    gc.collect()
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def _diff(before: Dict, after: Dict) -> Dict[str, Dict[str, float]]:
+    out = {}
+    for key, (total, count) in after.items():
+        t0, c0 = before.get(key, (0.0, 0))
+        if count > c0:
+            out[key[0] if key else ""] = {"total_s": round(total - t0, 4), "count": count - c0,
+                                          "mean_ms": round(1000 * (total - t0) / (count - c0), 3)}
+    return out
+
+def measure(ctx: BenchContext, name: str, n_companies: int, fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Time fn() from a cold start, then (optionally) repeat it under tracemalloc for peak memory."""
+    reset(ctx)
+    parse0, adapter0 = metrics.PARSE_SECONDS.totals(), metrics.ADAPTER_SECONDS.totals()
+    requests0 = ctx.stub.requests
+    started = time.perf_counter()
+    extra = fn() or {}
+    wall = time.perf_counter() - started
+    result = {
+        "companies": n_companies,
+        "wall_s": round(wall, 4),
+        "companies_per_s": round(n_companies / wall, 2) if wall else None,
+        "http_requests": ctx.stub.requests - requests0,
+        "adapter": _diff(adapter0, metrics.ADAPTER_SECONDS.totals()),
+        "parse": _diff(parse0, metrics.PARSE_SECONDS.totals()),
+        **extra,
+    }
+    if ctx.memory:
+        reset(ctx)
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_mem_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    ctx.results[name] = result
+    return result
+
+def _companies(ctx: BenchContext, n: int) -> List[Dict[str, Any]]:
+    return [{"id": f"c{i}", "canonical_name": name} for i, name in enumerate(ctx.names[:n])]
+
+def _products(ctx: BenchContext, n: int) -> Dict[str, list]:
+    tas = ("Oncology", "Immunology", "Neuroscience", "Cardiology")
+    return {name: [{"ta": tas[(i + j) % len(tas)], "launch_year": 2015 + (i + j) % 10, "is_marketed": j % 3 != 0}
+                   for j in range(i % 7)] for i, name in enumerate(ctx.names[:n])}
+
+def bench_orchestrator(ctx: BenchContext, n: int, concurrent: bool) -> Dict[str, Any]:
+    """enrich_company one company at a time; per-source latency percentiles from the timing breakdown."""
+    def run():
+        orchestrator = PublicEnrichmentOrchestrator(concurrent=concurrent)
+        per_source: Dict[str, List[float]] = {}
+        for name in ctx.names[:n]:
+            timings: Dict[str, Any] = {}
+            orchestrator.enrich_company(name, timings=timings)
+            for source, t in timings["adapters"].items():
+                per_source.setdefault(source, []).append(t["seconds"])
+        return {"adapter_latency_ms": {
+            source: {"p50": round(1000 * _percentile(v, 0.5), 3), "p95": round(1000 * _percentile(v, 0.95), 3)}
+            for source, v in sorted(per_source.items())}}
+
+    mode = "concurrent" if concurrent else "serial"
+    return measure(ctx, f"orchestrator_{mode}_n{n}", n, run)
+
+def bench_bulk(ctx: BenchContext, batch_size: int, max_workers: int) -> Dict[str, Any]:
+    companies, products = _companies(ctx, batch_size), _products(ctx, batch_size)
+    return measure(ctx, f"bulk_b{batch_size}_w{max_workers}", batch_size,
+                   lambda: enrich_companies_public(companies, products, max_workers=max_workers) and None)
+
+def bench_api(ctx: BenchContext, n: int, batch_size: int, max_workers: int) -> None:
+    """The FastAPI endpoints in-process (TestClient): sequential /enrich calls and one /enrich/bulk."""
+    from fastapi.testclient import TestClient
+    import api.main as api_main
+
+    from api.shared_cache import SQLiteSharedStore, SharedResults
+
+    client = TestClient(api_main.app)
+
+    def enrich_each():
+        # Cold like every other scenario: no cached responses, locally or shared between workers
+        api_main.result_cache.clear()
+        if api_main.shared_results is not None:
+            api_main.shared_results = SharedResults(SQLiteSharedStore(":memory:"))
+        for name in ctx.names[:n]:
+            client.post("/enrich", json={"company_name": name}).raise_for_status()
+
+    def bulk():
+        client.post("/enrich/bulk", json={"companies": _companies(ctx, batch_size),
+                                          "products_by_company": _products(ctx, batch_size),
+                                          "max_workers": max_workers}).raise_for_status()
+
+    measure(ctx, f"api_enrich_n{n}", n, enrich_each)
+    measure(ctx, f"api_bulk_b{batch_size}_w{max_workers}", batch_size, bulk)
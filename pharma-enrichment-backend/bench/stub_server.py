@@ -0,0 +1,106 @@
+from __future__ import annotations
+import random, threading, time, zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+class StubServer:
+    """
+    Local HTTP server standing in for every source host. The HttpClient sends requests here
+    via host_overrides, with the real host in X-Forwarded-Host; `sources.respond(host, path,
+    query)` supplies the response (None → 404).
+    latency_s / jitter_s: injected delay per host ("*" = every host), uniform ± jitter
+    failure_rate: per-host probability of answering 503 instead
+    etags: tag 200 responses with an ETag (hash of the body) and answer a matching
+           If-None-Match with 304, counted in `not_modified`
+    """
+
+    def __init__(self, sources, latency_s: Optional[Dict[str, float]] = None, jitter_s: float = 0.0,
+                 failure_rate: Optional[Dict[str, float]] = None, seed: int = 0, etags: bool = False):
+        self.sources = sources
+        self.etags = etags
+        self.latency_s = dict(latency_s or {})
+        self.jitter_s = jitter_s
+        self.failure_rate = dict(failure_rate or {})
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def overrides(self, hosts) -> Dict[str, str]:
+        return {h: self.url for h in hosts}
+
+    def _lookup(self, table: Dict[str, float], host: str) -> float:
+        return table.get(host, table.get("*", 0.0))
+
+    def _draw(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real sites
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def do_GET(self):
+                with server._rng_lock:
+                    server.requests += 1
+                host = self.headers.get("X-Forwarded-Host", "")
+                delay = server._lookup(server.latency_s, host)
+                if delay or server.jitter_s:
+                    time.sleep(max(0.0, delay + (server._draw() * 2 - 1) * server.jitter_s))
+                if server._draw() < server._lookup(server.failure_rate, host):
+                    return self._send(503, {"Content-Type": "text/plain"}, b"injected failure")
+                parts = urlsplit(self.path)
+                r = server.sources.respond(host, parts.path, parts.query)
+                if r is None:
+                    return self._send(404, {"Content-Type": "text/plain"}, b"not found")
+                status, headers, body = r
+                if server.etags and status == 200:
+                    etag = f'"{zlib.crc32(body):08x}"'
+                    headers = {**headers, "ETag": etag}
+                    if self.headers.get("If-None-Match") == etag:
+                        with server._rng_lock:
+                            server.not_modified += 1
+                        return self._send(304, {"ETag": etag}, b"")
+                self._send(status, headers, body)
+
+            def _send(self, status, headers, body):
+                try:
+                    self.send_response(status)
+                    for k, v in headers.items():
+                        self.send_header(k, v)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # the client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="bench-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,11 +1,22 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union, Any
 from dataclasses import dataclass
-from adapters.base import EnrichmentResult
+import requests
+from adapters.base import EnrichmentResult, SourceAdapter, ENRICHED_FIELDS, provenance_entry, utc_now_iso
+from adapters.cache import CacheMiss
+from adapters.health import get_health
+from adapters.http_client import DeadlineExceeded, deadline_scope
+from adapters import metrics
 from adapters.companies_marketcap import CompaniesMarketCapAdapter
 from adapters.pharmacompass import PharmaCompassAdapter
 from adapters.edgar import EdgarAdapter
 from adapters.clinicaltrials import ClinicalTrialsAdapter
+from adapters.names import NameResolver, get_resolver
 
 # Seed/override — update as needed
 SEED_BIG_PHARMA = {
@@ -14,39 +25,344 @@ SEED_BIG_PHARMA = {
     "Takeda", "Boehringer Ingelheim"
 }
 
+# Max simultaneous in-flight calls per source host (shared by every worker using this orchestrator)
+DEFAULT_HOST_LIMITS = {
+    "companiesmarketcap.com": 4,
+    "www.pharmacompass.com": 2,
+    "www.sec.gov": 8,
+    "clinicaltrials.gov": 8,
+}
+
+# Freshness policy for refresh_company: max field age in seconds (unlisted fields use DEFAULT_MAX_AGE_S)
+DEFAULT_MAX_AGE = {
+    "annual_revenue_usd": 30 * 24 * 3600,
+    "marketed_products_count": 30 * 24 * 3600,
+    "late_stage_assets_count": 7 * 24 * 3600,
+}
+DEFAULT_MAX_AGE_S = 7 * 24 * 3600
+
+# Fan adapters out on a thread pool (ENRICH_CONCURRENT=0: call them one after another)
+DEFAULT_CONCURRENT = os.environ.get("ENRICH_CONCURRENT", "1") != "0"
+
+# Overall per-company budget (seconds) when adapters run concurrently
+DEFAULT_DEADLINE_S = float(os.environ.get("ENRICH_DEADLINE_S", "45"))
+
+# Companies expected in flight at once on one orchestrator (API/bulk workers); the adapter pool
+# gets this many threads per adapter so calls abandoned at the deadline do not starve new ones
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("ENRICH_MAX_CONCURRENCY", "16"))
+
+# Provenance methods recorded when a source could not answer (see _call)
+UNAVAILABLE_METHODS = ("skipped", "timeout", "error")
+
+# Concurrent mode: fallback providers at most this costly run alongside the preferred one
+# (see SourceAdapter.COST; 0 = only local lookups)
+SPECULATE_MAX_COST = 0.0
+
+def degraded(provenance: Dict[str, Any]) -> bool:
+    """Some source could not answer (skipped/timeout/error): the result should not outlive the outage."""
+    return any((p or {}).get("method") in UNAVAILABLE_METHODS for p in provenance.values())
+
 @dataclass
 class Company:
     id: str
     canonical_name: str
 
 class PublicEnrichmentOrchestrator:
-    def __init__(self):
+    def __init__(self, concurrent: bool = DEFAULT_CONCURRENT, deadline_s: Optional[float] = DEFAULT_DEADLINE_S,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 resolver: Optional[NameResolver] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        """
+        concurrent: fan adapters out on a thread pool instead of calling them one by one.
+        deadline_s: per-company budget in concurrent mode, from the start of enrich_company;
+                    adapter calls still running (or still queued) when it runs out are
+                    abandoned and the partial result is returned.
+        executor: optional shared pool (otherwise one is created lazily).
+        max_concurrency: companies expected in flight at once; sizes the lazily created pool.
+        host_limits: per-host concurrency caps, merged over DEFAULT_HOST_LIMITS.
+        resolver: company-name normalizer/alias table (seed matching, bulk de-duplication).
+        """
+        # Merge precedence: filed SEC revenue (local index) beats the CompaniesMarketCap scrape
         self.adapters = [
+            EdgarAdapter(),
             CompaniesMarketCapAdapter(),
             PharmaCompassAdapter(),
-            EdgarAdapter(),
             ClinicalTrialsAdapter()
         ]
+        self.concurrent = concurrent
+        self.deadline_s = deadline_s
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = executor
+        limits = {**DEFAULT_HOST_LIMITS, **(host_limits or {})}
+        self._host_slots = {host: threading.BoundedSemaphore(n) for host, n in limits.items() if n and n > 0}
+        self.resolver = resolver or get_resolver()
+        self._seed_keys = {self.resolver.key(n) for n in SEED_BIG_PHARMA}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            # Threads are started on demand, so the headroom only costs something when it is used
+            self._executor = ThreadPoolExecutor(max_workers=len(self.adapters) * self.max_concurrency,
+                                                thread_name_prefix="adapter")
+        return self._executor
 
-    def enrich_company(self, company_name: str) -> EnrichmentResult:
+    def enrich_company(self, company_name: str, concurrent: Optional[bool] = None,
+                       deadline_s: Optional[float] = None,
+                       adapters: Optional[List[SourceAdapter]] = None,
+                       fields: Optional[Iterable[str]] = None,
+                       timings: Optional[Dict[str, Any]] = None) -> EnrichmentResult:
+        """
+        adapters: subset of self.adapters to query (default: all), still merged in order.
+        fields: fields the caller needs (default: all). Adapters are called in planned stages
+                (see plan()) and only while they can still fill a missing wanted field.
+        timings: optional dict filled with a timing breakdown for debugging: total_s, stages and
+                 per-source seconds/outcome plus HTTP, parse and cache figures.
+        """
+        started = time.perf_counter()
+        adapters = self.adapters if adapters is None else adapters
+        calls = timings.setdefault("adapters", {}) if timings is not None else None
+        wanted = set(ENRICHED_FIELDS if fields is None else fields)
         agg = EnrichmentResult()
-        # Seed override for Tier 1
-        if company_name in SEED_BIG_PHARMA:
+        # Seed override for Tier 1 (any spelling of a seeded company)
+        if company_name in SEED_BIG_PHARMA or self.resolver.key(company_name) in self._seed_keys:
             agg.is_global_big_pharma = True
-            agg.provenance["is_global_big_pharma"] = {
-                "source_url": "seed_big_pharma.yml",
-                "as_of": "seed",
-                "method": "override",
-                "notes": "Seeded Tier 1 list"
-            }
-
-        # Merge adapter outputs (first non-null wins per field)
-        for adapter in self.adapters:
-            res = adapter.enrich(company_name)
-            for field in ("annual_revenue_usd", "marketed_products_count", "launches_last_5y",
-                          "late_stage_assets_count", "top_ta", "top_ta_share", "is_global_big_pharma"):
-                if getattr(agg, field) is None and getattr(res, field) is not None:
-                    setattr(agg, field, getattr(res, field))
-                    if field in res.provenance:
-                        agg.provenance[field] = res.provenance[field]
+            agg.provenance["is_global_big_pharma"] = provenance_entry(
+                "seed_big_pharma.yml", "seed", "override", "Seeded Tier 1 list")
+
+        use_pool = self.concurrent if concurrent is None else concurrent
+        deadline_s = deadline_s if deadline_s is not None else self.deadline_s
+        end = None if deadline_s is None else time.monotonic() + deadline_s
+        wanted = {f for f in wanted if getattr(agg, f) is None}  # e.g. the seed override
+        done: Dict[int, Optional[EnrichmentResult]] = {}  # id(adapter) -> result (None = missed deadline)
+        stages = 0
+        while True:
+            stage = self.plan(adapters, wanted, done, speculate=use_pool)
+            if not stage:
+                break
+            if use_pool:
+                if end is not None and time.monotonic() >= end:
+                    break
+                results = self._run_concurrent(company_name, stage, end, calls)
+            else:
+                results = [self._call(adapter, company_name, calls) for adapter in stage]
+            done.update(zip(map(id, stage), results))
+            stages += 1
+
+        # Merge adapter outputs (first non-null wins per field, in adapter order)
+        for adapter in adapters:
+            res = done.get(id(adapter))
+            if res is not None:
+                self._merge(agg, res)
+
+        elapsed = time.perf_counter() - started
+        metrics.COMPANY_SECONDS.observe(elapsed)
+        if timings is not None:
+            timings.update(total_s=round(elapsed, 4), stages=stages)
         return agg
+
+    @staticmethod
+    def plan(adapters: List[SourceAdapter], wanted: Set[str], done: Dict[int, Optional[EnrichmentResult]],
+             speculate: bool = False) -> List[SourceAdapter]:
+        """
+        Next stage of adapter calls (in adapter order). For each wanted field, providers are
+        walked in precedence order: the field is settled at the first one that ran and returned
+        a value; otherwise the first provider not yet run joins the stage. Lower-precedence
+        providers are thus only called when everything ahead of them came back empty, so the
+        merge matches calling every adapter, and adapters that cannot add anything are skipped.
+        speculate=True (concurrent mode): cheap fallbacks (cost <= SPECULATE_MAX_COST) directly
+        behind that provider join the same stage instead of adding another round of waiting.
+        done: id(adapter) -> result of adapters already called for this company.
+        """
+        chosen = set()
+        for field in wanted:
+            providers = [a for a in adapters if field in a.provides()]
+            for i, a in enumerate(providers):
+                if id(a) in done:
+                    res = done[id(a)]
+                    if res is not None and getattr(res, field) is not None:
+                        break  # settled
+                    continue
+                chosen.add(id(a))
+                for fallback in providers[i + 1:] if speculate else ():
+                    if fallback.cost() > SPECULATE_MAX_COST:
+                        break
+                    chosen.add(id(fallback))
+                break
+        return [a for a in adapters if id(a) in chosen]
+
+    def refresh_company(self, company_name: str, prior: Union[EnrichmentResult, Dict[str, Any]],
+                        max_age: Optional[Dict[str, float]] = None, **kwargs) -> EnrichmentResult:
+        """
+        Incremental re-enrichment: only adapters that can provide a stale or missing field are
+        queried; fresh fields and their provenance are carried forward from `prior`.
+        If a re-queried source comes back empty, the previous value is kept (its old as_of
+        keeps it stale, so it is retried next time).
+        """
+        if isinstance(prior, dict):
+            prior = EnrichmentResult.from_dict(prior)
+        stale = self.stale_fields(prior, max_age)
+        fresh = self.enrich_company(company_name, fields=stale, **kwargs)
+
+        agg = EnrichmentResult()
+        for field in ENRICHED_FIELDS:
+            src = fresh if field in stale and getattr(fresh, field) is not None else prior
+            if getattr(src, field) is not None:
+                setattr(agg, field, getattr(src, field))
+                if field in src.provenance:
+                    agg.provenance[field] = src.provenance[field]
+        return agg
+
+    @staticmethod
+    def stale_fields(prior: EnrichmentResult, max_age: Optional[Dict[str, float]] = None,
+                     now: Optional[datetime] = None) -> Set[str]:
+        """Fields that are missing or older than their max age (overrides never expire)."""
+        policy = {**DEFAULT_MAX_AGE, **(max_age or {})}
+        now = now or datetime.now(timezone.utc)
+        stale = set()
+        for field in ENRICHED_FIELDS:
+            if getattr(prior, field) is None:
+                stale.add(field)
+                continue
+            if (prior.provenance.get(field) or {}).get("method") == "override":
+                continue
+            as_of = prior.field_as_of(field)
+            if as_of is None or (now - as_of).total_seconds() > policy.get(field, DEFAULT_MAX_AGE_S):
+                stale.add(field)
+        return stale
+
+    def _run_concurrent(self, company_name: str, adapters: List[SourceAdapter], end: Optional[float],
+                        calls: Optional[Dict[str, Any]] = None) -> List[Optional[EnrichmentResult]]:
+        """
+        Run adapters in parallel until `end` (the company's deadline, time.monotonic()); calls
+        still running or still queued for a thread then get a "timeout" placeholder, and queued
+        ones are never started.
+        Calls report their timings into a dict of their own, copied into `calls` here only once
+        they finished in time: an abandoned thread never touches the caller's breakdown.
+        """
+        submitted = time.monotonic()
+        started: Set[int] = set()  # positions a pool thread has picked up
+
+        def run(i: int, adapter: SourceAdapter) -> Tuple[Optional[EnrichmentResult], Dict[str, Any]]:
+            if end is not None and time.monotonic() >= end:
+                return None, {}  # picked up too late: already reported as a timeout
+            started.add(i)
+            own: Dict[str, Any] = {}
+            return self._call(adapter, company_name, own if calls is not None else None, end), own
+
+        futures = [self.executor.submit(run, i, adapter) for i, adapter in enumerate(adapters)]
+        results: List[Optional[EnrichmentResult]] = [None] * len(futures)
+        timeout = None if end is None else max(0.0, end - time.monotonic())
+        done, expired = wait(futures, timeout=timeout)
+        for i, f in enumerate(futures):
+            if f not in done:
+                continue
+            try:
+                results[i], own = f.result()
+            except Exception:
+                results[i], own = EnrichmentResult(), {}
+            if calls is not None:
+                calls.update(own)
+
+        for f in expired:
+            # A started thread finishes in the background (its HTTP calls stop at the deadline)
+            f.cancel()
+            i = futures.index(f)
+            adapter = adapters[i]
+            why = "missed the per-company deadline" if i in started else "still queued at the per-company deadline"
+            results[i] = self._unavailable(adapter, "timeout", why)
+            if calls is not None:
+                calls[adapter.SOURCE] = {"outcome": "timeout", "seconds": round(time.monotonic() - submitted, 4)}
+        return results
+
+    def _call(self, adapter: SourceAdapter, company_name: str,
+              calls: Optional[Dict[str, Any]] = None, end: Optional[float] = None) -> EnrichmentResult:
+        """
+        One adapter call, timed and counted per outcome (success/empty/error/timeout/skipped).
+        end: the caller's deadline (time.monotonic()); HTTP retries are not waited for past it,
+        so an abandoned call does not keep sleeping in a host slot.
+        """
+        started = time.perf_counter()
+        with metrics.breakdown_scope() as scope, deadline_scope(end):
+            res, outcome = self._guarded_call(adapter, company_name, end)
+        elapsed = time.perf_counter() - started
+        if outcome != "skipped":
+            metrics.ADAPTER_SECONDS.observe(elapsed, source=adapter.SOURCE)
+        metrics.ADAPTER_RESULTS.inc(source=adapter.SOURCE, outcome=outcome)
+        if calls is not None:
+            calls[adapter.SOURCE] = {"outcome": outcome, "seconds": round(elapsed, 4),
+                                     **{k: round(v, 4) for k, v in scope.items()}}
+        return res
+
+    def _guarded_call(self, adapter: SourceAdapter, company_name: str,
+                      end: Optional[float] = None) -> Tuple[EnrichmentResult, str]:
+        """
+        Call behind the host slot and circuit breaker. Failures never propagate: they come
+        back as an empty result whose provenance says why (skipped/timeout/error).
+        end: the caller's deadline; no host slot is waited for past it. A call that gave up
+        at its own deadline says nothing about the source, so the breaker does not count it.
+        """
+        breaker = get_health().breaker(adapter.SOURCE) if adapter.HOST else None
+        if breaker is not None and not breaker.allow():
+            return self._unavailable(adapter, "skipped",
+                                     f"{adapter.SOURCE} circuit open; retry in {breaker.retry_in():.0f}s"), "skipped"
+        slot = self._host_slots.get(adapter.HOST) if adapter.HOST else None
+        if slot is not None and not slot.acquire(timeout=None if end is None else max(0.0, end - time.monotonic())):
+            if breaker is not None:
+                breaker.record_abandoned()
+            return self._unavailable(adapter, "timeout", f"no {adapter.HOST} slot free before the deadline"), "timeout"
+        try:
+            res = adapter.enrich(company_name)
+        except CacheMiss:
+            # Offline mode and nothing cached: not the source's fault
+            if breaker is not None:
+                breaker.record_success()
+            return EnrichmentResult(), "empty"
+        except DeadlineExceeded as e:
+            if breaker is not None:
+                breaker.record_abandoned()
+            return self._unavailable(adapter, "timeout", f"{type(e).__name__}: {e}"), "timeout"
+        except Exception as e:
+            if breaker is not None:
+                # A 4xx (e.g. 429 after retries) means the source is up and answering: only
+                # server errors, timeouts and connection failures count towards opening it
+                if self._client_error(e):
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+            method = "timeout" if isinstance(e, requests.Timeout) else "error"
+            return self._unavailable(adapter, method, f"{type(e).__name__}: {e}"), method
+        finally:
+            if slot is not None:
+                slot.release()
+        if breaker is not None:
+            breaker.record_success()
+        filled = any(getattr(res, f) is not None for f in ENRICHED_FIELDS)
+        return res, "success" if filled else "empty"
+
+    @staticmethod
+    def _client_error(e: Exception) -> bool:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        return status is not None and 400 <= status < 500
+
+    @staticmethod
+    def _unavailable(adapter: SourceAdapter, method: str, notes: str) -> EnrichmentResult:
+        """Empty result recording that `adapter` could not answer (kept only for fields nobody fills)."""
+        res = EnrichmentResult()
+        entry = provenance_entry(adapter.HOST, utc_now_iso(), method, notes)
+        for field in adapter.provides():
+            res.provenance[field] = entry
+        return res
+
+    @staticmethod
+    def _merge(agg: EnrichmentResult, res: EnrichmentResult) -> None:
+        for field in ENRICHED_FIELDS:
+            if getattr(agg, field) is not None:
+                continue
+            if getattr(res, field) is not None:
+                setattr(agg, field, getattr(res, field))
+                agg.provenance.pop(field, None)
+                if field in res.provenance:
+                    agg.provenance[field] = res.provenance[field]
+            elif field not in agg.provenance and (res.provenance.get(field) or {}).get("method") in UNAVAILABLE_METHODS:
+                agg.provenance[field] = res.provenance[field]
@@ -1,57 +1,205 @@
 from __future__ import annotations
-from typing import Iterable, Dict, Any
-from enrichment.orchestrator import PublicEnrichmentOrchestrator
-from tiering.fallback import compute_company_features_from_products, assign_tier
+from collections import deque
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator, Dict, Any, Optional
+from adapters.base import EnrichmentResult
+from enrichment.orchestrator import PublicEnrichmentOrchestrator, degraded
+from tiering.fallback import compute_company_features_from_products, assign_tier, estimate_num_upcoming
 
-def enrich_companies_public(companies: Iterable[Dict[str, Any]], products_by_company: Dict[str, list]):
+# Upper bound on max_workers (one thread each), whatever a caller asks for
+MAX_BULK_WORKERS = int(os.environ.get("MAX_BULK_WORKERS", "32"))
+
+def enrich_companies_public(
+    companies: Iterable[Dict[str, Any]],
+    products_by_company: Dict[str, list],
+    max_workers: int = 1,
+    orchestrator: Optional[PublicEnrichmentOrchestrator] = None,
+    host_limits: Optional[Dict[str, int]] = None,
+    prior_results: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_age: Optional[Dict[str, float]] = None,
+    dedupe: bool = True,
+    products_keyed: bool = False,
+    shared: Optional[Any] = None,
+):
     """
     companies: iterable of {"id": "...", "canonical_name": "..."}
     products_by_company: dict name -> list of product dicts
-    Returns: list of upsert payloads with enrichment + tier
+    max_workers: number of companies enriched in parallel (1 = serial, capped at MAX_BULK_WORKERS)
+    orchestrator: reuse an existing orchestrator (e.g. the API's) instead of building one
+    host_limits: per-source-host concurrency caps for a freshly built orchestrator
+    prior_results: company_id -> previous payload (or its "enrichment" dict); those companies are
+                   refreshed incrementally, re-querying only sources whose fields are stale/missing
+    max_age: per-field max age in seconds for incremental refresh (see DEFAULT_MAX_AGE)
+    dedupe: enrich each entity once even if the batch spells it several ways
+            ("Merck & Co.", "MERCK & CO INC"); products are joined by the same normalized key
+    products_keyed: products_by_company is already keyed by entity (NameResolver.key), e.g. an
+                    UploadSpill's lookup; it only needs .get()
+    shared: a SharedResults (api/shared_cache.py) so worker processes enriching the same company
+            share one scrape and its result (incremental refreshes are not shared)
+    Returns: list of upsert payloads with enrichment + tier, in input order
+    """
+    return list(iter_enrich_companies_public(companies, products_by_company, max_workers=max_workers,
+                                             orchestrator=orchestrator, host_limits=host_limits, ordered=True,
+                                             prior_results=prior_results, max_age=max_age, dedupe=dedupe,
+                                             products_keyed=products_keyed, shared=shared))
+
+def iter_enrich_companies_public(
+    companies: Iterable[Dict[str, Any]],
+    products_by_company: Dict[str, list],
+    max_workers: int = 1,
+    orchestrator: Optional[PublicEnrichmentOrchestrator] = None,
+    host_limits: Optional[Dict[str, int]] = None,
+    ordered: bool = False,
+    return_exceptions: bool = False,
+    with_input: bool = False,
+    prior_results: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_age: Optional[Dict[str, float]] = None,
+    dedupe: bool = True,
+    products_keyed: bool = False,
+    shared: Optional[Any] = None,
+) -> Iterator[Any]:
     """
-    orchestrator = PublicEnrichmentOrchestrator()
-    results = []
-
-    for c in companies:
-        name = c["canonical_name"]
-        enr = orchestrator.enrich_company(name)
-
-        # Convert EnrichmentResult dataclass → dict
-        enrichment_dict = {
-            "annual_revenue_usd": enr.annual_revenue_usd,
-            "marketed_products_count": enr.marketed_products_count,
-            "launches_last_5y": enr.launches_last_5y,
-            "late_stage_assets_count": enr.late_stage_assets_count,
-            "top_ta": enr.top_ta,
-            "top_ta_share": enr.top_ta_share,
-            "is_global_big_pharma": enr.is_global_big_pharma,
-            "provenance": enr.provenance
-        }
-
-        # Derived features from our own products table
-        products = products_by_company.get(name, []) or []
-        derived = compute_company_features_from_products(products)
-
-        # Optional: infer num_upcoming from late_stage_assets_count (very naive) if not separately computed
-        num_upcoming = None
-        if enr.late_stage_assets_count and enr.late_stage_assets_count > 0:
-            num_upcoming = max(0, int(enr.late_stage_assets_count * 0.3))  # placeholder heuristic
-
-        # If you later compute modality concentration, pass primary_modality_share
-        tier = assign_tier(
-            company_name=name,
-            enrichment=enrichment_dict,
-            derived=derived,
-            num_upcoming=num_upcoming,
-            primary_modality_share=None
-        )
-
-        results.append({
-            "company_id": c["id"],
-            "canonical_name": name,
-            "enrichment": enrichment_dict,
-            "derived": derived,
-            "assigned_tier": tier
-        })
-
-    return results
+    Streaming form of enrich_companies_public: yields each payload as soon as it is ready.
+    `companies` is consumed lazily and at most 2 * max_workers companies are in flight, so
+    memory stays flat however long the input is.
+    ordered: yield in input order (otherwise in completion order)
+    return_exceptions: yield {"company_id", "canonical_name", "error"} for a failed company
+                       instead of raising and ending the stream
+    with_input: yield (company, payload) pairs so callers can match results back to inputs
+    """
+    max_workers = min(max_workers, MAX_BULK_WORKERS)
+    if orchestrator is None:
+        orchestrator = PublicEnrichmentOrchestrator(host_limits=host_limits, max_concurrency=max_workers)
+    entities = _EntityEnrichments(orchestrator, max_age, shared) if dedupe else None
+    if dedupe and not products_keyed:
+        products_by_company = orchestrator.resolver.index_products(products_by_company)
+    keyed = dedupe or products_keyed
+
+    def run(c: Dict[str, Any]) -> Any:
+        try:
+            prior = (prior_results or {}).get(c.get("id"))
+            payload = _enrich_one(orchestrator, c, products_by_company, prior=prior, max_age=max_age, entities=entities,
+                                  keyed=keyed, shared=shared)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            payload = {"company_id": c.get("id"), "canonical_name": c.get("canonical_name"), "error": str(e)}
+        return (c, payload) if with_input else payload
+
+    if max_workers <= 1:
+        for c in companies:
+            yield run(c)
+        return
+
+    # Threads spend nearly all their time waiting on the network; the orchestrator's
+    # per-host semaphores keep any single source from being hammered.
+    window = 2 * max_workers
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enrich")
+    inflight = deque()
+    try:
+        for c in companies:
+            inflight.append(pool.submit(run, c))
+            while len(inflight) >= window:
+                yield from _drain(inflight, ordered)
+        while inflight:
+            yield from _drain(inflight, ordered)
+    finally:
+        # Consumer went away (e.g. client disconnected): drop queued work
+        for f in inflight:
+            f.cancel()
+        pool.shutdown(wait=False)
+
+def _drain(inflight: deque, ordered: bool) -> Iterator[Any]:
+    """Yield at least one finished payload, removing it from `inflight`."""
+    if ordered:
+        yield inflight.popleft().result()
+        return
+    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+    for f in done:
+        inflight.remove(f)
+        yield f.result()
+
+# Entities remembered per batch for de-duplication (bounded so streaming memory stays flat)
+DEDUPE_MEMO_SIZE = 10_000
+
+class _EntityEnrichments:
+    """Per-batch memo: the first row for an entity enriches it, later spellings wait for that result."""
+
+    def __init__(self, orchestrator: PublicEnrichmentOrchestrator, max_age: Optional[Dict[str, float]],
+                 shared: Optional[Any] = None):
+        self.orchestrator = orchestrator
+        self.max_age = max_age
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, Future]" = OrderedDict()
+
+    def get(self, name: str, prior: Optional[Dict[str, Any]]) -> EnrichmentResult:
+        resolver = self.orchestrator.resolver
+        key = resolver.key(name)
+        with self._lock:
+            fut = self._results.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._results[key] = Future()
+                if len(self._results) > DEDUPE_MEMO_SIZE:
+                    self._results.popitem(last=False)
+        if not owner:
+            return fut.result()
+        try:
+            fut.set_result(_enrich_name(self.orchestrator, resolver.canonical(name), prior, self.max_age, self.shared))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut.result()
+
+def _enrich_name(orchestrator: PublicEnrichmentOrchestrator, name: str, prior: Optional[Dict[str, Any]],
+                 max_age: Optional[Dict[str, float]], shared: Optional[Any] = None) -> EnrichmentResult:
+    if prior:
+        return orchestrator.refresh_company(name, prior.get("enrichment", prior), max_age=max_age)
+    if shared is None:
+        return orchestrator.enrich_company(name)
+    value, _ = shared.get_or_compute(shared.key(orchestrator.resolver.key(name)),
+                                     lambda: orchestrator.enrich_company(name).to_dict(),
+                                     cacheable=lambda v: not degraded(v.get("provenance") or {}))
+    return EnrichmentResult.from_dict(value)
+
+def _enrich_one(orchestrator: PublicEnrichmentOrchestrator, c: Dict[str, Any], products_by_company: Dict[str, list],
+                prior: Optional[Dict[str, Any]] = None, max_age: Optional[Dict[str, float]] = None,
+                entities: Optional[_EntityEnrichments] = None, keyed: bool = False,
+                shared: Optional[Any] = None) -> Dict[str, Any]:
+    """keyed → products_by_company is keyed by normalized entity key (see NameResolver)."""
+    name = c["canonical_name"]
+    if entities is not None:
+        enr = entities.get(name, prior)
+    else:
+        enr = _enrich_name(orchestrator, name, prior, max_age, shared)
+
+    # Convert EnrichmentResult dataclass → dict
+    enrichment_dict = enr.to_dict()
+
+    # Derived features from our own products table
+    product_key = orchestrator.resolver.key(name) if keyed else name
+    products = products_by_company.get(product_key, []) or []
+    derived = compute_company_features_from_products(products)
+
+    # Optional: infer num_upcoming from late_stage_assets_count (very naive) if not separately computed
+    num_upcoming = estimate_num_upcoming(enr.late_stage_assets_count)
+
+    # If you later compute modality concentration, pass primary_modality_share
+    tier = assign_tier(
+        company_name=name,
+        enrichment=enrichment_dict,
+        derived=derived,
+        num_upcoming=num_upcoming,
+        primary_modality_share=None
+    )
+
+    return {
+        "company_id": c["id"],
+        "canonical_name": name,
+        "enrichment": enrichment_dict,
+        "derived": derived,
+        "assigned_tier": tier
+    }
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+from adapters.base import ENRICHED_FIELDS
+
+try:  # optional: only Arrow/Parquet export and upload need it (pip install pyarrow)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# format -> media type
+EXPORT_FORMATS = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+# Rows per record batch / Parquet row group; bounds memory however large the export
+BATCH_ROWS = 10_000
+
+DERIVED_FIELDS = ("top_ta", "top_ta_share", "num_products", "num_launches_recent")
+PROVENANCE_KEYS = ("source_url", "as_of", "method", "notes")
+
+def _str(v: Any) -> Any:
+    return None if v is None else str(v)
+
+def _int(v: Any) -> Any:
+    return None if v is None else int(v)
+
+def _float(v: Any) -> Any:
+    return None if v is None else float(v)
+
+def _bool(v: Any) -> Any:
+    return None if v is None else bool(v)
+
+# column -> (python coercion, arrow type name); "dict" = dictionary-encoded string
+_FIELD_TYPES = {
+    "annual_revenue_usd": (_float, "float64"),
+    "marketed_products_count": (_int, "int64"),
+    "launches_last_5y": (_int, "int64"),
+    "late_stage_assets_count": (_int, "int64"),
+    "top_ta": (_str, "dict"),
+    "top_ta_share": (_float, "float64"),
+    "is_global_big_pharma": (_bool, "bool"),
+}
+_DERIVED_TYPES = {"top_ta": (_str, "dict"), "top_ta_share": (_float, "float64"),
+                  "num_products": (_int, "int64"), "num_launches_recent": (_int, "int64")}
+
+def _layout() -> List[Tuple[str, Callable[[Dict[str, Any]], Any], str]]:
+    """(column, getter(payload), type) for every exported column, in order."""
+    cols = [
+        ("company_id", lambda p: _str(p.get("company_id")), "string"),
+        ("canonical_name", lambda p: _str(p.get("canonical_name")), "string"),
+        ("assigned_tier", lambda p: _str(p.get("assigned_tier")), "dict"),
+        ("error", lambda p: _str(p.get("error")), "string"),
+    ]
+    for f in ENRICHED_FIELDS:
+        conv, typ = _FIELD_TYPES[f]
+        cols.append((f, lambda p, f=f, conv=conv: conv((p.get("enrichment") or {}).get(f)), typ))
+    for f in DERIVED_FIELDS:
+        conv, typ = _DERIVED_TYPES[f]
+        cols.append((f"derived_{f}", lambda p, f=f, conv=conv: conv((p.get("derived") or {}).get(f)), typ))
+    # Provenance repeats a handful of values across rows: dictionary columns store each once
+    for f in ENRICHED_FIELDS:
+        for k in PROVENANCE_KEYS:
+            cols.append((f"{f}__{k}", lambda p, f=f, k=k: _str(
+                (((p.get("enrichment") or {}).get("provenance") or {}).get(f) or {}).get(k)), "dict"))
+    return cols
+
+LAYOUT = _layout()
+
+def columns(payloads: Iterable[Dict[str, Any]]) -> Dict[str, list]:
+    """enrich_companies_public payloads as flat column lists (one list per LAYOUT column)."""
+    rows = list(payloads)
+    return {name: [get(p) for p in rows] for name, get, _ in LAYOUT}
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Arrow/Parquet support needs pyarrow (pip install pyarrow)")
+
+def schema() -> "pa.Schema":
+    require_pyarrow()
+    types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "bool": pa.bool_(),
+             "dict": pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(name, types[typ]) for name, _, typ in LAYOUT])
+
+def iter_record_batches(payloads: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator["pa.RecordBatch"]:
+    s = schema()
+    batch: List[Dict[str, Any]] = []
+    for p in payloads:
+        batch.append(p)
+        if len(batch) >= batch_rows:
+            yield _record_batch(batch, s)
+            batch = []
+    if batch:
+        yield _record_batch(batch, s)
+
+def _record_batch(rows: List[Dict[str, Any]], s: "pa.Schema") -> "pa.RecordBatch":
+    cols = columns(rows)
+    return pa.record_batch([pa.array(cols[f.name], type=f.type) for f in s], schema=s)
+
+def write_results(payloads: Iterable[Dict[str, Any]], sink: Any, format: str = "parquet",
+                  batch_rows: int = BATCH_ROWS) -> int:
+    """
+    Stream payloads to `sink` (path or binary file) as Parquet or an Arrow IPC stream, one
+    record batch / row group per `batch_rows`. Returns the number of rows written.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    s = schema()
+    # Arrow *stream* format: dictionaries may differ per batch (the IPC file format forbids that)
+    writer = pq.ParquetWriter(sink, s, compression="zstd") if format == "parquet" else pa.ipc.new_stream(sink, s)
+    n = 0
+    try:
+        for batch in iter_record_batches(payloads, batch_rows):
+            writer.write_batch(batch)
+            n += batch.num_rows
+    finally:
+        writer.close()
+    return n
+
+if __name__ == "__main__":
+    import argparse
+    from jobs.runner import JobStore
+    parser = argparse.ArgumentParser(description="Export a bulk job's results as Parquet or Arrow")
+    parser.add_argument("job_id")
+    parser.add_argument("out", help="output file (.parquet or .arrows)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS))
+    args = parser.parse_args()
+    fmt = args.format or ("arrow" if args.out.endswith((".arrow", ".arrows")) else "parquet")
+    print(f"{write_results(JobStore().iter_results(args.job_id), args.out, fmt)} rows -> {args.out}")
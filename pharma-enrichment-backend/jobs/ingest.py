@@ -0,0 +1,194 @@
+"""
+Streaming ingestion of bulk uploads (NDJSON, gzip'd NDJSON, Arrow IPC, Parquet).
+
+Every row names its company by `canonical_name`. A row with an `id` registers that company
+(once per id, in upload order) and is also a product row if it fills a PRODUCT_KEYS column;
+rows without `id` are product rows. A product is the row's non-null non-company columns.
+So both a denormalized companies x products export and a company list (extra columns such
+as `ticker` are fine) followed by product rows work. NDJSON rows may also carry `products` (a list) and `prior` (the
+previous result, for incremental refresh).
+
+Rows are parsed a batch at a time into a scratch SQLite file keyed by entity, so memory
+follows the batch in flight rather than the upload.
+"""
+from __future__ import annotations
+import gzip, io, json, os, sqlite3, tempfile, threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+from adapters.names import NameResolver, get_resolver
+from jobs.export import pa, pq, require_pyarrow
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_TYPE = "application/vnd.apache.parquet"
+
+# Rows parsed and inserted per step; ingest memory scales with this, not the upload
+INGEST_BATCH_ROWS = 5_000
+
+# Row keys that describe the company itself; every other non-null column is a product field
+COMPANY_KEYS = ("id", "canonical_name", "products", "prior")
+# Columns that make a company row (one with `id`) a product row as well
+PRODUCT_KEYS = ("ta", "launch_year", "is_marketed", "modality")
+
+def detect_format(head: bytes, content_type: str = "") -> str:
+    """Upload format from the content type or magic bytes: parquet, arrow_file, arrow_stream or ndjson."""
+    ct = content_type.split(";")[0].strip().lower()
+    if ct in NDJSON_TYPES:
+        return "ndjson"
+    if ct == PARQUET_TYPE or head.startswith(b"PAR1"):
+        return "parquet"
+    if ct == ARROW_FILE_TYPE or head.startswith(b"ARROW1"):
+        return "arrow_file"
+    if ct == ARROW_STREAM_TYPE or head.startswith(b"\xff\xff\xff\xff"):
+        return "arrow_stream"
+    return "ndjson"
+
+def iter_upload_rows(f: BinaryIO, content_type: str = "", content_encoding: str = "",
+                     batch_rows: int = INGEST_BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """Row dicts from an uploaded body, `batch_rows` at a time. gzip applies to NDJSON and Arrow streams."""
+    head = f.read(8)
+    f.seek(0)
+    if content_encoding.strip().lower() == "gzip" or head.startswith(b"\x1f\x8b"):
+        f = gzip.GzipFile(fileobj=f, mode="rb")
+        head = f.peek(8)[:8]
+    fmt = detect_format(head, content_type)
+
+    if fmt == "ndjson":
+        batch = []
+        for n, line in enumerate(io.TextIOWrapper(f, encoding="utf-8"), 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"line {n}: expected a JSON object")
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    require_pyarrow()
+    if fmt == "parquet":
+        for rb in pq.ParquetFile(f).iter_batches(batch_size=batch_rows):
+            yield rb.to_pylist()
+        return
+    if fmt == "arrow_file":
+        reader = pa.ipc.open_file(f)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = pa.ipc.open_stream(f)
+    for rb in batches:
+        for offset in range(0, rb.num_rows, batch_rows):
+            yield rb.slice(offset, batch_rows).to_pylist()
+
+class _SpillLookup:
+    """Read-only .get() view over one spill table, standing in for a dict (products_by_company, prior_results)."""
+
+    def __init__(self, spill: "UploadSpill", sql: str, many: bool):
+        self._spill, self._sql, self._many = spill, sql, many
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._spill._lock:
+            if self._spill.closed:
+                return default
+            rows = self._spill._db.execute(self._sql, (key,)).fetchall()
+        if not rows:
+            return default
+        return [json.loads(r[0]) for r in rows] if self._many else json.loads(rows[0][0])
+
+class UploadSpill:
+    """
+    An upload spilled to a scratch SQLite file: companies in upload order, products keyed by
+    entity (NameResolver.key) and optional priors by company id. `products` and `priors`
+    plug into iter_enrich_companies_public / JobStore.create with products_keyed=True.
+    """
+
+    def __init__(self, resolver: Optional[NameResolver] = None):
+        self.resolver = resolver or get_resolver()
+        fd, self.path = tempfile.mkstemp(prefix="ingest-", suffix=".sqlite3")
+        os.close(fd)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Scratch data: nothing to recover after a crash
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.executescript("""
+            CREATE TABLE companies (idx INTEGER PRIMARY KEY, id TEXT UNIQUE, company TEXT NOT NULL, prior TEXT);
+            CREATE TABLE products (key TEXT NOT NULL, product TEXT NOT NULL);
+            CREATE INDEX products_key ON products(key);
+        """)
+        self.rows = 0
+        self.closed = False
+        self.products = _SpillLookup(self, "SELECT product FROM products WHERE key = ? ORDER BY rowid", many=True)
+        self.priors = _SpillLookup(self, "SELECT prior FROM companies WHERE id = ? AND prior IS NOT NULL", many=False)
+
+    @classmethod
+    def from_upload(cls, f: BinaryIO, content_type: str = "", content_encoding: str = "",
+                    resolver: Optional[NameResolver] = None) -> "UploadSpill":
+        spill = cls(resolver)
+        try:
+            for batch in iter_upload_rows(f, content_type, content_encoding):
+                spill.add_rows(batch)
+        except BaseException:
+            spill.close()
+            raise
+        return spill
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        companies, products = [], []
+        for row in rows:
+            self.rows += 1
+            name = row.get("canonical_name")
+            if not name:
+                raise ValueError(f"row {self.rows}: canonical_name is required")
+            key = self.resolver.key(name)
+            company_row = row.get("id") is not None
+            if company_row:
+                prior = row.get("prior")
+                companies.append((str(row["id"]), json.dumps({"id": row["id"], "canonical_name": name}),
+                                  json.dumps(prior) if prior else None))
+            for p in row.get("products") or ():
+                products.append((key, json.dumps(p, default=str)))
+            if company_row and all(row.get(k) is None for k in PRODUCT_KEYS):
+                continue  # company attributes only (e.g. ticker): not a product
+            product = {k: v for k, v in row.items() if k not in COMPANY_KEYS and v is not None}
+            if product:
+                products.append((key, json.dumps(product, default=str)))
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO companies (id, company, prior) VALUES (?, ?, ?)", companies)
+            self._db.executemany("INSERT INTO products (key, product) VALUES (?, ?)", products)
+            self._db.execute("COMMIT")
+
+    def companies(self, chunk: int = INGEST_BATCH_ROWS) -> Iterator[Dict[str, Any]]:
+        """Registered companies in upload order, read a chunk at a time."""
+        last = 0
+        while True:
+            with self._lock:
+                if self.closed:
+                    return
+                rows = self._db.execute("SELECT idx, company FROM companies WHERE idx > ? ORDER BY idx LIMIT ?",
+                                        (last, chunk)).fetchall()
+            if not rows:
+                return
+            for _, c in rows:
+                yield json.loads(c)
+            last = rows[-1][0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def close(self) -> None:
+        """Drop the scratch file; safe to call twice, and lookups after it find nothing."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._db.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
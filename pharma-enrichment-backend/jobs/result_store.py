@@ -0,0 +1,152 @@
+from __future__ import annotations
+import os, json, time, sqlite3, threading
+from collections import Counter
+from typing import Iterable, Dict, Any, List, Optional
+from adapters.cache import DATA_DIR
+from tiering.batch import assign_tier_batch
+from tiering.fallback import current_thresholds, estimate_num_upcoming
+
+RESULTS_DB_PATH = os.environ.get("ENRICHMENT_RESULTS_PATH", os.path.join(DATA_DIR, "results.sqlite3"))
+
+# How often thresholds() re-reads the stored thresholds, to pick up a retier applied by another
+# worker process; in between (and on the tiering hot path) the in-memory copy is served
+THRESHOLDS_RECHECK_S = float(os.environ.get("ENRICH_THRESHOLDS_RECHECK_S", "5"))
+
+class ResultStore:
+    """
+    Materialized latest enrichment + derived features per company. Tier inputs are kept as
+    plain columns so the whole universe can be re-tiered without re-scraping or JSON parsing.
+    """
+
+    def __init__(self, path: str = RESULTS_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Settings that must agree with the stored tiers, e.g. the thresholds they were computed with
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS company_results (
+                company_id TEXT PRIMARY KEY,
+                canonical_name TEXT,
+                enrichment TEXT,
+                derived TEXT,
+                is_global_big_pharma INTEGER,
+                top_ta_share REAL,
+                num_products INTEGER,
+                num_launches_recent INTEGER,
+                num_upcoming INTEGER,
+                primary_modality_share REAL,
+                assigned_tier TEXT,
+                updated_at REAL
+            )""")
+        self._thresholds = self._read_thresholds()
+        self._thresholds_read_at = time.monotonic()
+
+    def upsert(self, payloads: Iterable[Dict[str, Any]]) -> int:
+        """Store enrich_companies_public payloads (error records are skipped)."""
+        rows = []
+        now = time.time()
+        for p in payloads:
+            if "error" in p or p.get("company_id") is None:
+                continue
+            enr, derived = p.get("enrichment") or {}, p.get("derived") or {}
+            rows.append((
+                str(p["company_id"]), p.get("canonical_name"), json.dumps(enr), json.dumps(derived),
+                1 if enr.get("is_global_big_pharma") else 0,
+                derived.get("top_ta_share"),
+                derived.get("num_products"),
+                derived.get("num_launches_recent"),
+                estimate_num_upcoming(enr.get("late_stage_assets_count")),
+                p.get("primary_modality_share"),
+                p.get("assigned_tier"),
+                now,
+            ))
+        if rows:
+            with self._lock:
+                self._db.execute("BEGIN")
+                self._db.executemany("INSERT OR REPLACE INTO company_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+        return len(rows)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM company_results").fetchone()[0]
+
+    def thresholds(self) -> Dict[str, float]:
+        """
+        Tier thresholds last applied by retier(apply=True); empty until one was applied.
+        Served from memory; re-read at most every THRESHOLDS_RECHECK_S for other workers' changes.
+        """
+        if time.monotonic() - self._thresholds_read_at >= THRESHOLDS_RECHECK_S:
+            self._thresholds_read_at = time.monotonic()
+            self._thresholds = self._read_thresholds()
+        return self._thresholds
+
+    def _read_thresholds(self) -> Dict[str, float]:
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM meta WHERE key LIKE '%_threshold'").fetchall()
+        return {k: float(v) for k, v in rows}
+
+    def get(self, company_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT company_id, canonical_name, enrichment, derived, assigned_tier FROM company_results WHERE company_id = ?",
+                (company_id,)).fetchone()
+        if row is None:
+            return None
+        return {"company_id": row[0], "canonical_name": row[1], "enrichment": json.loads(row[2]),
+                "derived": json.loads(row[3]), "assigned_tier": row[4]}
+
+    def retier(self, top_ta_share_thresh: Optional[float] = None, platform_share_thresh: Optional[float] = None,
+               apply: bool = False, max_changes: int = 100) -> Dict[str, Any]:
+        """
+        Recompute assigned_tier for every stored company from the stored features.
+        apply=False is a what-if: nothing is written. apply=True writes the new tiers and, in the
+        same transaction, the thresholds (making them current; see thresholds()). Returns tier
+        counts, how many companies move, and up to max_changes example moves.
+        """
+        current = current_thresholds()
+        if top_ta_share_thresh is None:
+            top_ta_share_thresh = current["top_ta_share_threshold"]
+        if platform_share_thresh is None:
+            platform_share_thresh = current["platform_share_threshold"]
+        applied = {"top_ta_share_threshold": top_ta_share_thresh, "platform_share_threshold": platform_share_thresh}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT company_id, is_global_big_pharma, top_ta_share, num_products, num_launches_recent, "
+                "num_upcoming, primary_modality_share, assigned_tier FROM company_results").fetchall()
+        if not rows:
+            if apply:
+                self._write(applied, [])
+            return {"total": 0, "changed": 0, "tiers": {}, "changes": [], "applied": apply, "thresholds": applied}
+
+        ids, big, share, products, launches, upcoming, modality, old = (list(col) for col in zip(*rows))
+        new = assign_tier_batch(big, share, products, launches, num_upcoming=upcoming,
+                                primary_modality_share=modality, top_ta_share_thresh=top_ta_share_thresh,
+                                platform_share_thresh=platform_share_thresh)
+        changed = [(cid, o, n) for cid, o, n in zip(ids, old, new) if o != n]
+
+        if apply:
+            self._write(applied, changed)
+
+        return {
+            "total": len(ids),
+            "changed": len(changed),
+            "tiers": dict(Counter(new.tolist())),
+            "changes": [{"company_id": cid, "from": o, "to": n} for cid, o, n in changed[:max_changes]],
+            "applied": apply,
+            "thresholds": applied,
+        }
+
+    def _write(self, thresholds: Dict[str, float], changed: List[Any]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("UPDATE company_results SET assigned_tier = ? WHERE company_id = ?",
+                                 [(n, cid) for cid, _, n in changed])
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [(k, repr(v)) for k, v in thresholds.items()])
+            self._db.execute("COMMIT")
+            self._thresholds = dict(thresholds)
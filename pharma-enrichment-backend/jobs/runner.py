@@ -0,0 +1,298 @@
+from __future__ import annotations
+import os, json, time, uuid, queue, socket, sqlite3, threading
+from typing import Iterable, Iterator, Dict, Any, List, Optional, Tuple
+from adapters.cache import DATA_DIR
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+from jobs.enrich_companies_public import iter_enrich_companies_public
+from jobs.result_store import ResultStore
+from adapters.names import get_resolver
+
+JOBS_DB_PATH = os.environ.get("ENRICHMENT_JOBS_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+
+# Pending companies are loaded and enriched this many at a time, so a job never holds its
+# whole input in memory and a crash loses at most one chunk of in-flight work.
+CHUNK_SIZE = 500
+
+# Every API worker process runs a JobRunner. A runner leases the job it works on and renews the
+# lease as results arrive; a job whose lease expired (its worker died) is taken over by another.
+JOB_LEASE_S = float(os.environ.get("ENRICHMENT_JOB_LEASE_S", "300"))
+
+# Columns added after jobs.sqlite3 was first released: (table, column, type). CREATE TABLE IF
+# NOT EXISTS leaves an existing file's schema alone, so older databases get them on open.
+ADDED_COLUMNS = (
+    ("jobs", "max_age", "TEXT"),
+    ("job_items", "prior", "TEXT"),
+    ("jobs", "owner", "TEXT"),
+    ("jobs", "lease_expires", "REAL"),
+)
+
+def add_missing_columns(db: sqlite3.Connection, columns: Iterable[Tuple[str, str, str]]) -> None:
+    for table, column, typ in columns:
+        existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {typ}")
+
+class JobStore:
+    """
+    SQLite store for bulk enrichment jobs. Every company is a row that is checkpointed as soon
+    as its result arrives, so a restarted job only re-runs the rows still pending.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,          -- queued | running | completed | failed
+                created_at REAL,
+                updated_at REAL,
+                total INTEGER DEFAULT 0,
+                done INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                max_workers INTEGER DEFAULT 1,
+                max_age TEXT,                  -- JSON per-field max age for incremental refresh
+                owner TEXT,                    -- runner holding the lease while running
+                lease_expires REAL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                company TEXT NOT NULL,
+                products TEXT,
+                prior TEXT,                    -- previous payload for incremental refresh
+                status TEXT NOT NULL,          -- pending | done | error
+                result TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_pending ON job_items(job_id, status, idx);
+        """)
+        add_missing_columns(self._db, ADDED_COLUMNS)
+
+    def create(self, companies: Iterable[Dict[str, Any]], products_by_company: Dict[str, list], max_workers: int = 1,
+               prior_results: Optional[Dict[str, Dict[str, Any]]] = None, max_age: Optional[Dict[str, float]] = None,
+               products_keyed: bool = False) -> str:
+        """products_keyed: products_by_company is already keyed by entity (e.g. an UploadSpill lookup)."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        prior_results = prior_results or {}
+        resolver = get_resolver()
+        products_by_key = products_by_company if products_keyed else resolver.index_products(products_by_company)
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("INSERT INTO jobs (id, status, created_at, updated_at, max_workers, max_age) VALUES (?, 'queued', ?, ?, ?, ?)",
+                             (job_id, now, now, max_workers, json.dumps(max_age) if max_age else None))
+            total = 0
+            for idx, c in enumerate(companies):
+                products = products_by_key.get(resolver.key(c.get("canonical_name") or ""), [])
+                prior = prior_results.get(c.get("id"))
+                self._db.execute("INSERT INTO job_items (job_id, idx, company, products, prior, status) VALUES (?, ?, ?, ?, ?, 'pending')",
+                                 (job_id, idx, json.dumps(c), json.dumps(products), json.dumps(prior) if prior else None))
+                total += 1
+            self._db.execute("UPDATE jobs SET total = ? WHERE id = ?", (total, job_id))
+            self._db.execute("COMMIT")
+        return job_id
+
+    def claim(self, job_id: str, owner: str, lease_s: float = JOB_LEASE_S) -> bool:
+        """Take a queued job, or a running one whose lease expired; False if another runner holds it."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                taken = self._db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_expires = ?, updated_at = ? WHERE id = ? "
+                    "AND (status = 'queued' OR (status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)))",
+                    (owner, now + lease_s, now, job_id, now)).rowcount == 1
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return taken
+
+    def renew(self, job_id: str, owner: str, lease_s: float = JOB_LEASE_S) -> bool:
+        """Extend the lease; False once another runner has taken the job over."""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (time.time() + lease_s, job_id, owner)).rowcount == 1
+
+    def finish(self, job_id: str, owner: str, status: str, error: Optional[str] = None) -> bool:
+        """Mark the job completed/failed and drop the lease (only if `owner` still holds it)."""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ?", (status, error, time.time(), job_id, owner)).rowcount == 1
+
+    def pending(self, job_id: str, limit: int = CHUNK_SIZE) -> List[Tuple[int, Dict[str, Any], list, Optional[Dict[str, Any]]]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idx, company, products, prior FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?",
+                (job_id, limit)).fetchall()
+        return [(idx, json.loads(c), json.loads(p or "[]"), json.loads(pr) if pr else None) for idx, c, p, pr in rows]
+
+    def max_age(self, job_id: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            row = self._db.execute("SELECT max_age FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def checkpoint(self, job_id: str, idx: int, payload: Dict[str, Any]) -> bool:
+        """Record one result; False (and nothing counted) if the item was already finished."""
+        status = "error" if "error" in payload else "done"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                moved = self._db.execute(
+                    "UPDATE job_items SET status = ?, result = ? WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                    (status, json.dumps(payload), job_id, idx)).rowcount == 1
+                if moved:
+                    self._db.execute("UPDATE jobs SET done = done + 1, failed = failed + ?, updated_at = ? WHERE id = ?",
+                                     (1 if status == "error" else 0, time.time(), job_id))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return moved
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, created_at, updated_at, total, done, failed, max_workers, error FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "status", "created_at", "updated_at", "total", "done", "failed", "max_workers", "error")
+        job = dict(zip(keys, row))
+        job["progress"] = (job["done"] / job["total"]) if job["total"] else 1.0
+        return job
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Finished results in input order (pending rows are skipped)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND status != 'pending' ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_results(self, job_id: str, chunk: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """All finished results in input order, read a chunk at a time (for exports)."""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT idx, result FROM job_items WHERE job_id = ? AND status != 'pending' AND idx > ? ORDER BY idx LIMIT ?",
+                    (job_id, last, chunk)).fetchall()
+            if not rows:
+                return
+            for _, r in rows:
+                yield json.loads(r)
+            last = rows[-1][0]
+
+    def claimable(self) -> List[str]:
+        """Jobs no live runner holds: queued, or running with an expired lease."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND "
+                "(lease_expires IS NULL OR lease_expires < ?)) ORDER BY created_at", (time.time(),)).fetchall()
+        return [r[0] for r in rows]
+
+class JobRunner:
+    """
+    Background worker that drains queued jobs one at a time, checkpointing every company.
+    Runners in several processes can share one JobStore: each job is run by the runner that
+    claimed it, and the others pick it up only once its lease lapses.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, orchestrator: Optional[PublicEnrichmentOrchestrator] = None,
+                 result_store: Optional[ResultStore] = None, lease_s: float = JOB_LEASE_S,
+                 shared: Optional[Any] = None):
+        self.store = store or JobStore()
+        self.orchestrator = orchestrator or PublicEnrichmentOrchestrator()
+        self.result_store = result_store  # optional: also materialize results for re-tiering
+        self.lease_s = lease_s
+        self.shared = shared  # optional SharedResults: share scrapes with the API's other paths/workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._resume = True
+
+    def start(self, resume: bool = True) -> None:
+        """
+        Start the worker. With resume=True it also runs jobs no live runner holds (left by a
+        previous process, or by a worker that died), checking again every half lease.
+        """
+        if self._thread is not None:
+            return
+        self._resume = resume
+        if resume:
+            for job_id in self.store.claimable():
+                self._queue.put(job_id)
+        self._thread = threading.Thread(target=self._loop, name="enrich-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._queue.put("")  # wake the worker
+
+    def submit(self, companies: Iterable[Dict[str, Any]], products_by_company: Dict[str, list], max_workers: int = 1,
+               prior_results: Optional[Dict[str, Dict[str, Any]]] = None, max_age: Optional[Dict[str, float]] = None,
+               products_keyed: bool = False) -> str:
+        job_id = self.store.create(companies, products_by_company, max_workers, prior_results=prior_results,
+                                   max_age=max_age, products_keyed=products_keyed)
+        self._queue.put(job_id)
+        return job_id
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job_id = self._queue.get(timeout=self.lease_s / 2)
+            except queue.Empty:
+                if self._resume:
+                    for job_id in self.store.claimable():
+                        self._queue.put(job_id)
+                continue
+            if job_id and not self._stop.is_set():
+                self.run(job_id)
+
+    def run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or not self.store.claim(job_id, self.owner, self.lease_s):
+            return  # finished, or another runner has it
+        max_age = self.store.max_age(job_id)
+        renewed = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                chunk = self.store.pending(job_id)
+                if not chunk:
+                    break
+                by_key = {id(c): idx for idx, c, _, _ in chunk}
+                # Items already carry their entity's merged products: keep one spelling per entity
+                products, seen = {}, set()
+                for _, c, p, _ in chunk:
+                    key = self.orchestrator.resolver.key(c.get("canonical_name") or "")
+                    if key not in seen:
+                        seen.add(key)
+                        products[c.get("canonical_name")] = p
+                priors = {c.get("id"): pr for _, c, _, pr in chunk if pr}
+                for c, payload in iter_enrich_companies_public(
+                        (c for _, c, _, _ in chunk), products, max_workers=job["max_workers"],
+                        orchestrator=self.orchestrator, return_exceptions=True, with_input=True,
+                        prior_results=priors, max_age=max_age, shared=self.shared):
+                    if self.store.checkpoint(job_id, by_key[id(c)], payload) and self.result_store is not None:
+                        self.result_store.upsert([payload])
+                    if self._stop.is_set():
+                        self.store.renew(job_id, self.owner, 0)  # hand it to the next runner now
+                        return
+                    if time.monotonic() - renewed > self.lease_s / 3:
+                        if not self.store.renew(job_id, self.owner, self.lease_s):
+                            return  # lease lost (e.g. this process stalled): the new holder finishes
+                        renewed = time.monotonic()
+            if not self._stop.is_set():
+                self.store.finish(job_id, self.owner, "completed")
+        except Exception as e:
+            self.store.finish(job_id, self.owner, "failed", error=str(e))
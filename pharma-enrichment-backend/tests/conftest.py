@@ -0,0 +1,47 @@
+"""
+Offline fixtures: every source host is served by the bench stub server (bench/stub_server.py)
+from the synthetic universe in bench/fixtures.py, and every local store lives in a scratch
+directory, so the suite never touches the network or the user's .data.
+"""
+from __future__ import annotations
+import os, sys, tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench.run import _STORE_ENV
+
+# Before any project module reads its store paths
+DATA_DIR = tempfile.mkdtemp(prefix="enrichment-tests-")
+os.environ["ENRICHMENT_DATA_DIR"] = DATA_DIR
+for _name in _STORE_ENV:
+    os.environ.pop(_name, None)
+os.environ["ENRICH_SHARED_CACHE"] = "memory"
+
+import pytest
+from bench.fixtures import SyntheticSources
+from bench.stub_server import StubServer
+from bench import scenarios
+
+UNIVERSE = 40
+
+@pytest.fixture(scope="session")
+def sources() -> SyntheticSources:
+    src = SyntheticSources(UNIVERSE, page_kb=1)
+    scenarios.prepare_sec_index(src, DATA_DIR)
+    return src
+
+@pytest.fixture(scope="session")
+def stub_server(sources):
+    with StubServer(sources, etags=True) as stub:
+        yield stub
+
+@pytest.fixture
+def stub(stub_server, sources) -> StubServer:
+    """The shared stub with cold caches, slug table, page index and breakers (see scenarios.reset)."""
+    scenarios.reset(scenarios.BenchContext(stub=stub_server, names=sources.names, backoff_s=0.01))
+    return stub_server
+
+@pytest.fixture
+def names(sources):
+    return sources.names
@@ -0,0 +1,71 @@
+from bench import scenarios
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+from jobs.enrich_companies_public import enrich_companies_public
+
+PROVIDED = ("annual_revenue_usd", "marketed_products_count", "late_stage_assets_count")
+
+def _undated(enrichment):
+    """Enrichment without provenance as_of, which is wall-clock time to the second."""
+    provenance = {f: {k: v for k, v in p.items() if k != "as_of"} for f, p in enrichment["provenance"].items()}
+    return {**enrichment, "provenance": provenance}
+
+def test_spellings_of_one_company_are_enriched_once(stub, names):
+    name = names[3]
+    spellings = [name, name.upper(), f"{name} Inc.", f"{name.lower()}, Inc"]
+    requests0 = stub.requests
+    single = enrich_companies_public([{"id": "a", "canonical_name": name}], {}, max_workers=1)
+    single_requests = stub.requests - requests0
+
+    scenarios.reset(scenarios.BenchContext(stub=stub, names=names))
+    requests0 = stub.requests
+    products = {spellings[1]: [{"ta": "Oncology", "is_marketed": True}],
+                spellings[2]: [{"ta": "Oncology", "is_marketed": True}]}
+    payloads = enrich_companies_public([{"id": str(i), "canonical_name": s} for i, s in enumerate(spellings)],
+                                       products, max_workers=4)
+    assert stub.requests - requests0 == single_requests
+    assert [p["company_id"] for p in payloads] == ["0", "1", "2", "3"]
+    assert all(_undated(p["enrichment"]) == _undated(single[0]["enrichment"]) for p in payloads)
+    # Products are joined by entity, whatever spelling they were keyed by
+    assert {p["derived"]["num_products"] for p in payloads} == {2}
+
+def test_dedupe_off_enriches_every_row(stub, names):
+    name = names[4]
+    rows = [{"id": "1", "canonical_name": name}, {"id": "2", "canonical_name": name.upper()}]
+    orchestrator = PublicEnrichmentOrchestrator()
+    calls = []
+    enrich = orchestrator.enrich_company
+    orchestrator.enrich_company = lambda n, **kw: calls.append(n) or enrich(n, **kw)
+    enrich_companies_public(rows, {}, max_workers=2, orchestrator=orchestrator, dedupe=False)
+    assert sorted(calls) == sorted([name, name.upper()])
+
+def _complete_priors(names):
+    """First-pass payloads for companies every provided field was found for."""
+    payloads = enrich_companies_public([{"id": str(i), "canonical_name": n} for i, n in enumerate(names[:12])], {},
+                                       max_workers=4)
+    return {p["company_id"]: p for p in payloads
+            if all(p["enrichment"][f] is not None for f in PROVIDED)}
+
+def test_refresh_with_fresh_priors_makes_no_requests(stub, names):
+    priors = _complete_priors(names)
+    assert priors
+    scenarios.reset(scenarios.BenchContext(stub=stub, names=names))
+    requests0 = stub.requests
+    companies = [{"id": cid, "canonical_name": p["canonical_name"]} for cid, p in priors.items()]
+    refreshed = enrich_companies_public(companies, {}, max_workers=4, prior_results=priors)
+    assert stub.requests == requests0
+    assert [p["enrichment"] for p in refreshed] == [priors[c["id"]]["enrichment"] for c in companies]
+
+def test_refresh_requeries_only_stale_fields(stub, names):
+    priors = _complete_priors(names)
+    scenarios.reset(scenarios.BenchContext(stub=stub, names=names))
+    orchestrator = PublicEnrichmentOrchestrator()
+    for prior in priors.values():
+        timings = {}
+        result = orchestrator.refresh_company(prior["canonical_name"], prior["enrichment"],
+                                              max_age={"late_stage_assets_count": 0}, timings=timings)
+        assert set(timings["adapters"]) == {"clinicaltrials"}
+        fresh = result.to_dict()
+        for field in ("annual_revenue_usd", "marketed_products_count"):
+            assert fresh[field] == prior["enrichment"][field]
+            assert fresh["provenance"][field] == prior["enrichment"]["provenance"][field]
+        assert fresh["late_stage_assets_count"] == prior["enrichment"]["late_stage_assets_count"]
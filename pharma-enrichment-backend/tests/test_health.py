@@ -0,0 +1,106 @@
+import time
+import pytest
+import requests
+from adapters.base import EnrichmentResult, SourceAdapter
+from adapters.health import CircuitBreaker, configure_health
+from adapters.http_client import DeadlineExceeded
+from bench.stub_server import StubServer
+from bench import scenarios
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+
+def test_breaker_opens_after_consecutive_failures():
+    b = CircuitBreaker(failures=3, cooldown_s=60)
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == b.CLOSED and b.allow()
+    b.record_success()  # a success resets the count
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == b.CLOSED
+    b.record_failure()
+    assert b.state == b.OPEN and not b.allow()
+    assert 0 < b.retry_in() <= 60
+
+def test_half_open_lets_one_probe_through():
+    b = CircuitBreaker(failures=1, cooldown_s=0.05, max_cooldown_s=1)
+    b.record_failure()
+    assert not b.allow()
+    time.sleep(0.06)
+    assert b.allow()
+    assert b.state == b.HALF_OPEN
+    assert not b.allow()  # only one probe at a time
+
+    b.record_failure()  # failed probe: open again, cool-down doubled
+    assert (b.state, b.cooldown_s) == (b.OPEN, 0.1)
+    time.sleep(0.11)
+    assert b.allow()
+    b.record_success()
+    assert (b.state, b.cooldown_s, b.consecutive_failures) == (b.CLOSED, 0.05, 0)
+
+def test_abandoned_probe_frees_the_half_open_slot():
+    b = CircuitBreaker(failures=1, cooldown_s=0.05)
+    b.record_failure()
+    time.sleep(0.06)
+    assert b.allow()
+    b.record_abandoned()  # no verdict: still half-open, and the next call may probe
+    assert b.state == b.HALF_OPEN and b.allow()
+
+class FailingAdapter(SourceAdapter):
+    HOST = "source.example"
+    SOURCE = "failing"
+    PROVIDES = ("late_stage_assets_count",)
+
+    def __init__(self, status=None):
+        self.status = status
+
+    def enrich(self, company_name):
+        if self.status == "deadline":
+            raise DeadlineExceeded("source.example: deadline passed before the request was sent")
+        if self.status is None:
+            raise requests.ConnectionError("refused")
+        r = requests.Response()
+        r.status_code = self.status
+        raise requests.HTTPError(f"HTTP {self.status}", response=r)
+
+@pytest.mark.parametrize("status, opens", [(None, True), (503, True), (404, False), (429, False), ("deadline", False)])
+def test_only_server_side_failures_open_the_breaker(status, opens):
+    health = configure_health(failures=2, cooldown_s=60)
+    orchestrator = PublicEnrichmentOrchestrator()
+    orchestrator.adapters = [FailingAdapter(status)]
+    for i in range(3):
+        result = orchestrator.enrich_company(f"c{i}")
+        assert result.provenance["late_stage_assets_count"]["method"] in ("error", "timeout", "skipped")
+    assert health.breaker("failing").state == (CircuitBreaker.OPEN if opens else CircuitBreaker.CLOSED)
+    configure_health()
+
+def test_host_slot_wait_stops_at_the_deadline():
+    health = configure_health(failures=1, cooldown_s=60)
+    orchestrator = PublicEnrichmentOrchestrator(concurrent=True, deadline_s=0.1, host_limits={"source.example": 1})
+    orchestrator.adapters = [FailingAdapter(503)]
+    slot = orchestrator._host_slots["source.example"]
+    slot.acquire()  # every slot busy with other companies
+    try:
+        started = time.monotonic()
+        result = orchestrator.enrich_company("c")
+        assert time.monotonic() - started < 0.3
+    finally:
+        slot.release()
+    assert result.provenance["late_stage_assets_count"]["method"] == "timeout"
+    # Congestion of our own making is not the source's fault
+    assert health.breaker("failing").state == CircuitBreaker.CLOSED
+    configure_health()
+
+def test_failing_host_is_skipped_without_requests(sources):
+    with StubServer(sources, failure_rate={"clinicaltrials.gov": 1.0}) as stub:
+        scenarios.reset(scenarios.BenchContext(stub=stub, names=sources.names, max_retries=0))
+        health = configure_health(failures=3, cooldown_s=60)
+        orchestrator = PublicEnrichmentOrchestrator()
+        methods = []
+        for name in sources.names[:6]:
+            requests0 = stub.requests
+            result = orchestrator.enrich_company(name, fields={"late_stage_assets_count"})
+            methods.append((result.provenance["late_stage_assets_count"]["method"], stub.requests - requests0))
+        assert methods[:3] == [("error", 1)] * 3
+        assert methods[3:] == [("skipped", 0)] * 3
+        assert health.breaker("clinicaltrials").state == CircuitBreaker.OPEN
+    configure_health()
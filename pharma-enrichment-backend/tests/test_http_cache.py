@@ -0,0 +1,45 @@
+import pytest
+from adapters.cache import CacheMiss, configure_cache, get_cache
+from adapters.clinicaltrials import ClinicalTrialsAdapter
+from adapters.health import CircuitBreaker, get_health
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+
+LATE = {"late_stage_assets_count"}
+
+def test_fresh_entry_is_served_without_a_request(stub, names):
+    orchestrator = PublicEnrichmentOrchestrator()
+    first = orchestrator.enrich_company(names[0], fields=LATE)
+    requests0 = stub.requests
+    second = orchestrator.enrich_company(names[0], fields=LATE)
+    assert stub.requests == requests0
+    assert second.late_stage_assets_count == first.late_stage_assets_count
+
+def test_stale_entry_is_revalidated_with_a_conditional_get(stub, names):
+    configure_cache(path=":memory:", ttl_by_source={"clinicaltrials": 0.0})
+    adapter = ClinicalTrialsAdapter()
+    params = {"expr": f"AREA[LeadSponsorName] ({names[1]})"}
+    first = adapter.fetch(adapter.API, params=params)
+    requests0, not_modified0 = stub.requests, stub.not_modified
+    second = adapter.fetch(adapter.API, params=params)
+    assert (stub.requests - requests0, stub.not_modified - not_modified0) == (1, 1)
+    assert second.from_cache and second.content == first.content
+
+def test_offline_mode_serves_only_what_is_cached(stub, names):
+    orchestrator = PublicEnrichmentOrchestrator()
+    cached = orchestrator.enrich_company(names[2], fields=LATE)
+    get_cache().offline = True
+    requests0 = stub.requests
+
+    again = orchestrator.enrich_company(names[2], fields=LATE)
+    assert again.late_stage_assets_count == cached.late_stage_assets_count
+
+    unknown = orchestrator.enrich_company(names[3], fields=LATE)
+    assert unknown.late_stage_assets_count is None
+    assert stub.requests == requests0
+    # Nothing cached is not the source's fault
+    assert get_health().breaker("clinicaltrials").state == CircuitBreaker.CLOSED
+
+def test_offline_fetch_of_an_unknown_url_raises_cache_miss(stub):
+    configure_cache(path=":memory:", offline=True)
+    with pytest.raises(CacheMiss):
+        ClinicalTrialsAdapter().fetch("https://clinicaltrials.gov/never-fetched")
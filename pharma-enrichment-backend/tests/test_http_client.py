@@ -0,0 +1,42 @@
+import time
+import pytest
+from adapters.clinicaltrials import ClinicalTrialsAdapter
+from adapters.http_client import DeadlineExceeded, HttpClient, TokenBucket
+from bench.scenarios import SOURCE_HOSTS
+from bench.stub_server import StubServer
+
+URL = ClinicalTrialsAdapter.API
+
+def client(stub, rate=(1e6, 1e6), **kwargs):
+    return HttpClient(host_rates={"clinicaltrials.gov": rate}, backoff_s=0.01,
+                      host_overrides=stub.overrides(SOURCE_HOSTS), **kwargs)
+
+def test_bucket_gives_up_at_the_deadline_without_taking_a_token():
+    bucket = TokenBucket(rate=1.0, capacity=1)
+    assert not bucket.acquire(deadline=time.monotonic() - 1)
+    assert bucket.acquire(deadline=time.monotonic() + 0.05)  # the token is still there
+    started = time.monotonic()
+    assert not bucket.acquire(deadline=started + 0.1)  # next token in ~1s: no point waiting
+    assert time.monotonic() - started < 0.05
+
+def test_nothing_is_sent_once_the_deadline_has_passed(stub, names):
+    http = client(stub)
+    requests0 = stub.requests
+    with pytest.raises(DeadlineExceeded):
+        http.get(URL, params={"expr": names[0]}, deadline=time.monotonic() - 0.01)
+    assert stub.requests == requests0
+
+def test_rate_limit_wait_past_the_deadline_sends_nothing(stub, names):
+    http = client(stub, rate=(1.0, 1))
+    assert http.get(URL, params={"expr": names[0]}).status_code == 200
+    requests0 = stub.requests
+    with pytest.raises(DeadlineExceeded):
+        http.get(URL, params={"expr": names[1]}, deadline=time.monotonic() + 0.1)
+    assert stub.requests == requests0
+
+def test_timeout_cut_by_the_deadline_is_a_deadline_error(sources, names):
+    with StubServer(sources, latency_s={"*": 0.5}) as slow:
+        http = client(slow)
+        with pytest.raises(DeadlineExceeded):
+            http.get(URL, params={"expr": names[0]}, deadline=time.monotonic() + 0.1)
+        assert slow.requests == 1  # no retry after the deadline
@@ -0,0 +1,57 @@
+import time
+import pytest
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+from jobs.runner import JobRunner, JobStore
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+def companies(names, n):
+    return [{"id": str(i), "canonical_name": name} for i, name in enumerate(names[:n])]
+
+def test_job_runs_to_completion(stub, names, store):
+    runner = JobRunner(store, PublicEnrichmentOrchestrator(), lease_s=5)
+    job_id = store.create(companies(names, 6), {}, 2)
+    runner.run(job_id)
+    job = store.get(job_id)
+    assert (job["status"], job["done"], job["total"]) == ("completed", 6, 6)
+    assert [r["company_id"] for r in store.results(job_id)] == [str(i) for i in range(6)]
+
+def test_job_of_a_dead_runner_is_resumed_where_it_stopped(stub, names, store):
+    job_id = store.create(companies(names, 6), {}, 2)
+    # A runner claimed the job, checkpointed two companies and died
+    assert store.claim(job_id, "dead-runner", lease_s=0.05)
+    for idx in (0, 1):
+        assert store.checkpoint(job_id, idx, {"company_id": str(idx), "from": "dead-runner"})
+    assert store.claimable() == []
+    time.sleep(0.1)
+    assert store.claimable() == [job_id]
+
+    enriched = []
+    orchestrator = PublicEnrichmentOrchestrator()
+    enrich = orchestrator.enrich_company
+    orchestrator.enrich_company = lambda n, **kw: enriched.append(n) or enrich(n, **kw)
+    JobRunner(store, orchestrator, lease_s=5).run(job_id)
+
+    job = store.get(job_id)
+    assert (job["status"], job["done"]) == ("completed", 6)
+    assert sorted(enriched) == sorted(names[2:6])
+    results = store.results(job_id)
+    assert [r.get("from") for r in results[:2]] == ["dead-runner", "dead-runner"]
+    assert all("enrichment" in r for r in results[2:])
+
+def test_live_lease_keeps_other_runners_out(stub, names, store):
+    job_id = store.create(companies(names, 2), {}, 1)
+    assert store.claim(job_id, "runner-a", lease_s=60)
+    assert not store.claim(job_id, "runner-b", lease_s=60)
+    JobRunner(store, PublicEnrichmentOrchestrator(), lease_s=60).run(job_id)
+    assert store.get(job_id)["done"] == 0
+    assert not store.finish(job_id, "runner-b", "completed")
+    assert store.finish(job_id, "runner-a", "completed")
+
+def test_checkpoint_counts_an_item_once(store):
+    job_id = store.create([{"id": "1", "canonical_name": "Acme"}], {}, 1)
+    assert store.checkpoint(job_id, 0, {"company_id": "1"})
+    assert not store.checkpoint(job_id, 0, {"company_id": "1"})
+    assert store.get(job_id)["done"] == 1
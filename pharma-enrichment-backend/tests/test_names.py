@@ -0,0 +1,17 @@
+import pytest
+from adapters.names import NameResolver, normalize_company_name
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+
+def test_spellings_share_a_key():
+    assert normalize_company_name("MERCK & CO INC") == normalize_company_name("Merck and Co.") == "merck"
+    assert normalize_company_name("Société Générale SA") == "societe generale"
+    r = NameResolver(aliases_path=None)
+    assert r.key("Bristol-Myers Squibb Company") == r.key("BMS") == r.key("Bristol Myers Squibb")
+    assert r.canonical("GlaxoSmithKline plc") == "GSK"
+
+@pytest.mark.parametrize("name", ["Merck Group", "Merck KGaA", "EMD Serono"])
+def test_merck_kgaa_is_not_merck_and_co(name):
+    r = NameResolver(aliases_path=None)
+    assert r.key(name) == r.key("Merck KGaA") != r.key("Merck & Co., Inc.")
+    result = PublicEnrichmentOrchestrator(resolver=r).enrich_company(name, adapters=[])
+    assert result.is_global_big_pharma is None  # only Merck & Co. is seeded
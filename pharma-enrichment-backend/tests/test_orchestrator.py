@@ -0,0 +1,107 @@
+import random, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from adapters.base import EnrichmentResult, ENRICHED_FIELDS, SourceAdapter
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+
+FIELDS = ("annual_revenue_usd", "marketed_products_count", "late_stage_assets_count")
+
+class FakeAdapter(SourceAdapter):
+    HOST = None
+
+    def __init__(self, name, provides, cost, values, delay=0.0):
+        self.SOURCE, self.PROVIDES, self.COST = name, provides, cost
+        self.values, self.delay = values, delay
+        self.calls = 0
+
+    def enrich(self, company_name):
+        self.calls += 1
+        time.sleep(self.delay)
+        res = EnrichmentResult()
+        for field, value in self.values.items():
+            res.set_with_provenance(field, value, source_url=self.SOURCE)
+        return res
+
+def orchestrator(adapters, **kwargs):
+    o = PublicEnrichmentOrchestrator(**kwargs)
+    o.adapters = adapters
+    return o
+
+def merged_in_order(adapters):
+    """What calling every adapter and merging in adapter order gives."""
+    agg = EnrichmentResult()
+    for a in adapters:
+        PublicEnrichmentOrchestrator._merge(agg, a.enrich("X"))
+    return agg
+
+def test_lower_precedence_source_only_called_when_needed():
+    edgar = FakeAdapter("edgar", ("annual_revenue_usd",), 0.0, {"annual_revenue_usd": 1})
+    cmc = FakeAdapter("cmc", ("annual_revenue_usd",), 2.0, {"annual_revenue_usd": 2})
+    result = orchestrator([edgar, cmc]).enrich_company("X")
+    assert (result.annual_revenue_usd, cmc.calls) == (1, 0)
+
+    edgar.values = {}
+    result = orchestrator([edgar, cmc]).enrich_company("X")
+    assert result.annual_revenue_usd == 2
+    assert result.provenance["annual_revenue_usd"]["source_url"] == "cmc"
+
+@pytest.mark.parametrize("seed", range(5))
+def test_serial_and_concurrent_merge_like_calling_everything(seed):
+    rng = random.Random(seed)
+    for _ in range(60):
+        adapters = []
+        for i in range(rng.randint(1, 5)):
+            provides = tuple(f for f in FIELDS if rng.random() < 0.5)
+            values = {f: i * 10 + j for j, f in enumerate(provides) if rng.random() < 0.5}
+            adapters.append(FakeAdapter(f"a{i}", provides, rng.choice([0.0, 1.0, 2.0]), values,
+                                        delay=rng.choice([0.0, 0.002])))
+        expected = merged_in_order(adapters)
+        for concurrent in (False, True):
+            got = orchestrator(adapters, concurrent=concurrent).enrich_company("X")
+            assert [getattr(got, f) for f in FIELDS] == [getattr(expected, f) for f in FIELDS]
+            for f in FIELDS:
+                if getattr(expected, f) is not None:
+                    assert got.provenance[f]["source_url"] == expected.provenance[f]["source_url"]
+
+def test_stub_serial_and_concurrent_agree(stub, names):
+    serial = PublicEnrichmentOrchestrator(concurrent=False)
+    concurrent = PublicEnrichmentOrchestrator(concurrent=True)
+    for name in names[:12]:
+        a, b = serial.enrich_company(name), concurrent.enrich_company(name)
+        assert [getattr(a, f) for f in ENRICHED_FIELDS] == [getattr(b, f) for f in ENRICHED_FIELDS]
+        assert {f: (p["source_url"], p["method"]) for f, p in a.provenance.items()} == \
+               {f: (p["source_url"], p["method"]) for f, p in b.provenance.items()}
+        assert a.annual_revenue_usd is not None
+
+def test_abandoned_call_misses_deadline_without_touching_timings():
+    slow = FakeAdapter("slow", ("top_ta",), 0.0, {"top_ta": "slow"}, delay=0.3)
+    fast = FakeAdapter("fast", ("top_ta_share",), 0.0, {"top_ta_share": 0.5}, delay=0.01)
+    timings = {}
+    result = orchestrator([slow, fast], concurrent=True, deadline_s=0.1).enrich_company("X", timings=timings)
+    assert result.top_ta is None and result.top_ta_share == 0.5
+    assert result.provenance["top_ta"]["method"] == "timeout"
+    before = repr(timings)
+    time.sleep(0.35)  # the abandoned call finishes meanwhile
+    assert repr(timings) == before
+    assert timings["adapters"]["slow"]["outcome"] == "timeout"
+
+def test_deadline_covers_calls_still_queued_for_a_thread():
+    first = FakeAdapter("first", ("top_ta",), 0.0, {"top_ta": "x"}, delay=0.3)
+    queued = FakeAdapter("queued", ("top_ta_share",), 0.0, {"top_ta_share": 0.5})
+    with ThreadPoolExecutor(1) as pool:
+        o = orchestrator([first, queued], concurrent=True, deadline_s=0.1, executor=pool)
+        started = time.monotonic()
+        result = o.enrich_company("X")
+        assert time.monotonic() - started < 0.25
+    assert result.provenance["top_ta"]["notes"] == "missed the per-company deadline"
+    assert result.provenance["top_ta_share"]["notes"] == "still queued at the per-company deadline"
+    assert queued.calls == 0  # never started once the deadline had passed
+
+def test_deadline_spans_every_stage():
+    edgar = FakeAdapter("edgar", ("annual_revenue_usd",), 1.0, {}, delay=0.08)
+    cmc = FakeAdapter("cmc", ("annual_revenue_usd",), 2.0, {"annual_revenue_usd": 2}, delay=0.08)
+    started = time.monotonic()
+    result = orchestrator([edgar, cmc], concurrent=True, deadline_s=0.12).enrich_company("X")
+    assert time.monotonic() - started < 0.15
+    assert (edgar.calls, cmc.calls) == (1, 1)
+    assert result.provenance["annual_revenue_usd"]["method"] == "timeout"
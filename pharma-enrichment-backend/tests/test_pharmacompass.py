@@ -0,0 +1,48 @@
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from adapters.pharmacompass import PharmaCompassAdapter
+
+class GatedAdapter(PharmaCompassAdapter):
+    """Index page fetches block until `gate` is set and are counted."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.fetches = 0
+
+    def fetch(self, *args, **kwargs):
+        self.fetches += 1
+        self.gate.wait(5)
+        return super().fetch(*args, **kwargs)
+
+@pytest.fixture
+def adapter(stub):
+    GatedAdapter.clear_index()  # the index lives on the adapter class
+    return GatedAdapter()
+
+def test_cold_index_is_fetched_once(adapter):
+    with ThreadPoolExecutor(4) as ex:
+        futures = [ex.submit(adapter.refresh_index) for _ in range(4)]
+        time.sleep(0.05)
+        adapter.gate.set()
+        indexes = [f.result() for f in futures]
+    assert adapter.fetches == len(PharmaCompassAdapter.INDEX_PAGES)
+    assert all(index is indexes[0] for index in indexes)
+
+def test_expired_index_keeps_answering_while_it_is_rebuilt(adapter, names):
+    adapter.gate.set()
+    counts = {n: adapter.enrich(n).marketed_products_count for n in names[:10]}
+    assert any(counts.values())
+
+    adapter.gate.clear()
+    GatedAdapter._index_expires = 0.0
+    refresher = threading.Thread(target=adapter.refresh_index)
+    refresher.start()
+    time.sleep(0.05)  # the refresher is now blocked fetching, outside the lock
+    started = time.monotonic()
+    assert {n: adapter.enrich(n).marketed_products_count for n in names[:10]} == counts
+    assert time.monotonic() - started < 0.5
+    adapter.gate.set()
+    refresher.join()
+    assert GatedAdapter._index_expires > time.monotonic()
@@ -0,0 +1,94 @@
+import time
+import pytest
+from api.result_cache import ResultCache, make_etag
+
+def test_fresh_then_stale_then_miss():
+    cache = ResultCache(ttl_s=10, stale_s=100)
+    entry = cache.put("k", {"v": 1}, make_etag({"v": 1}))
+    t0 = entry.stored_at
+    # Half a second either side of each boundary: t0 is a float, so t0 + 110 - t0 may not be 110
+    assert cache.get("k", now=t0 + 9.5) == (entry, "fresh")
+    assert cache.get("k", now=t0 + 10.5) == (entry, "stale")
+    assert cache.get("k", now=t0 + 109.5) == (entry, "stale")
+    assert cache.get("k", now=t0 + 110.5) == (None, "miss")
+    assert len(cache) == 0
+
+def test_one_refresh_at_a_time():
+    cache = ResultCache(ttl_s=0, stale_s=100)
+    cache.put("k", {"v": 1}, '"a"')
+    assert cache.begin_refresh("k")
+    assert not cache.begin_refresh("k")
+    cache.end_refresh("k")
+    assert cache.begin_refresh("k")
+    assert not cache.begin_refresh("missing")
+
+def test_age_of_a_shared_value_counts():
+    cache = ResultCache(ttl_s=10, stale_s=100)
+    entry = cache.put("k", {"v": 1}, '"a"', age_s=8)
+    assert cache.get("k")[1] == "fresh"
+    assert cache.max_age(entry) in (1, 2)
+
+def test_lru_bound():
+    cache = ResultCache(max_entries=2)
+    for k in "abc":
+        cache.put(k, {}, '"x"')
+    assert [cache.get(k)[1] for k in "abc"] == ["miss", "fresh", "fresh"]
+
+@pytest.fixture
+def api(stub):
+    from fastapi.testclient import TestClient
+    import api.main as api_main
+    api_main.result_cache.clear()
+    ttl_s = api_main.result_cache.ttl_s
+    with TestClient(api_main.app) as client:
+        yield api_main, client
+    api_main.result_cache.ttl_s = ttl_s
+    api_main.result_cache.clear()
+
+def test_enrich_states_and_etags(api, stub, names):
+    api_main, client = api
+    name = names[5]
+    miss = client.post("/enrich", json={"company_name": name})
+    assert (miss.status_code, miss.headers["x-cache"]) == (200, "miss")
+    assert miss.headers["cache-control"].startswith("max-age=")
+
+    requests0 = stub.requests
+    hit = client.post("/enrich", json={"company_name": name.upper()})
+    assert hit.headers["x-cache"] == "fresh" and stub.requests == requests0
+    assert hit.json()["company_name"] == name.upper()
+    # Same result, different body: the ETag differs per spelling
+    assert hit.headers["etag"] != miss.headers["etag"]
+    assert client.post("/enrich", json={"company_name": name.upper()},
+                       headers={"If-None-Match": miss.headers["etag"]}).status_code == 200
+    not_modified = client.post("/enrich", json={"company_name": name}, headers={"If-None-Match": miss.headers["etag"]})
+    assert (not_modified.status_code, not_modified.content) == (304, b"")
+
+    bypass = client.post("/enrich?timings=true", json={"company_name": name})
+    assert bypass.headers["x-cache"] == "bypass" and bypass.json()["timings"]
+
+def test_stale_entry_is_served_and_refreshed_once(api, names):
+    api_main, client = api
+    name = names[6]
+    client.post("/enrich", json={"company_name": name})
+    api_main.result_cache.ttl_s = 0.2
+    time.sleep(0.25)
+
+    calls = []
+    enrich = api_main.orchestrator.enrich_company
+
+    def slow_enrich(n, **kw):
+        calls.append(n)
+        time.sleep(0.3)  # keeps the refresh in flight while the stale entry is served
+        return enrich(n, **kw)
+    api_main.orchestrator.enrich_company = slow_enrich
+    try:
+        stale = [client.post("/enrich", json={"company_name": name}) for _ in range(3)]
+        assert {r.headers["x-cache"] for r in stale} == {"stale"}
+        assert all(r.json() == stale[0].json() for r in stale)
+        deadline = time.monotonic() + 5
+        while client.post("/enrich", json={"company_name": name}).headers["x-cache"] != "fresh":
+            assert time.monotonic() < deadline, "background refresh did not land"
+            time.sleep(0.02)
+    finally:
+        del api_main.orchestrator.enrich_company
+    assert len(calls) == 1
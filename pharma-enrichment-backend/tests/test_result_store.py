@@ -0,0 +1,50 @@
+import time
+import pytest
+from jobs import result_store
+from jobs.result_store import ResultStore
+from tiering import fallback
+
+def payload(cid, share):
+    return {"company_id": cid, "canonical_name": cid, "enrichment": {"is_global_big_pharma": False},
+            "derived": {"top_ta_share": share, "num_products": 3, "num_launches_recent": 0}, "assigned_tier": None}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.sqlite3")
+
+def test_retier_preview_then_apply(path):
+    store = ResultStore(path)
+    store.upsert([payload("a", 0.65), payload("b", 0.5)])
+    preview = store.retier(top_ta_share_thresh=0.55)
+    assert (preview["total"], preview["applied"]) == (2, False)
+    assert store.get("a")["assigned_tier"] is None and store.thresholds() == {}
+
+    applied = store.retier(top_ta_share_thresh=0.55, apply=True)
+    assert {c["company_id"]: c["to"] for c in applied["changes"]} == \
+           {c["company_id"]: c["to"] for c in preview["changes"]}
+    assert applied["changed"] == 2  # nothing was tiered before
+    assert all(store.get(c["company_id"])["assigned_tier"] == c["to"] for c in applied["changes"])
+    assert store.thresholds()["top_ta_share_threshold"] == 0.55
+
+def test_thresholds_are_served_from_memory(path, monkeypatch):
+    store = ResultStore(path)
+    store.retier(top_ta_share_thresh=0.5, apply=True)
+    reads = []
+    monkeypatch.setattr(store, "_read_thresholds", lambda: reads.append(1) or {})
+    fallback.use_threshold_source(store.thresholds)
+    try:
+        for _ in range(1000):
+            assert fallback.current_thresholds()["top_ta_share_threshold"] == 0.5
+    finally:
+        fallback.use_threshold_source(None)
+    assert reads == []
+
+def test_other_workers_pick_up_applied_thresholds(path, monkeypatch):
+    monkeypatch.setattr(result_store, "THRESHOLDS_RECHECK_S", 0.05)
+    worker_a, worker_b = ResultStore(path), ResultStore(path)
+    assert worker_b.thresholds() == {}
+    worker_a.retier(top_ta_share_thresh=0.45, apply=True)
+    assert worker_a.thresholds()["top_ta_share_threshold"] == 0.45
+    time.sleep(0.06)
+    assert worker_b.thresholds()["top_ta_share_threshold"] == 0.45
+    assert ResultStore(path).thresholds()["top_ta_share_threshold"] == 0.45  # and a restart
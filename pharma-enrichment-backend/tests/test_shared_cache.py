@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from api.shared_cache import MemorySharedStore, SQLiteSharedStore, SharedResults
+from enrichment.orchestrator import PublicEnrichmentOrchestrator
+from jobs.enrich_companies_public import enrich_companies_public
+from bench import scenarios
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    """Factory of stores sharing one backend (two SQLite handles stand in for two workers)."""
+    if request.param == "memory":
+        store = MemorySharedStore()
+        return lambda: store
+    return lambda: SQLiteSharedStore(str(tmp_path / "shared.sqlite3"))
+
+def test_lease_is_exclusive_until_released(make_store):
+    a, b = make_store(), make_store()
+    assert a.acquire("k", "worker-a", 60)
+    assert not b.acquire("k", "worker-b", 60)
+    assert not b.renew("k", "worker-b", 60)
+    b.release("k", "worker-b")  # not the holder: no effect
+    assert not b.acquire("k", "worker-b", 60)
+    a.release("k", "worker-a")
+    assert b.acquire("k", "worker-b", 60)
+
+def test_lapsed_lease_can_be_taken_over(make_store):
+    a, b = make_store(), make_store()
+    assert a.acquire("k", "worker-a", 0.05)
+    time.sleep(0.1)
+    assert b.acquire("k", "worker-b", 60)
+    assert not a.renew("k", "worker-a", 60)  # the old holder finds out it lost the lease
+
+def test_workers_compute_once(make_store):
+    computed = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.2)
+        return {"v": 1}
+
+    workers = [SharedResults(make_store(), poll_s=0.01) for _ in range(4)]
+    with ThreadPoolExecutor(4) as ex:
+        results = list(ex.map(lambda w: w.get_or_compute("k", compute, 60), workers))
+    assert len(computed) == 1
+    assert [v for v, _ in results] == [{"v": 1}] * 4
+
+def test_lease_is_renewed_while_computing(make_store):
+    computed = []
+
+    def slow():
+        computed.append(1)
+        time.sleep(0.6)  # longer than the lease
+        return {"v": 1}
+
+    workers = [SharedResults(make_store(), lease_s=0.15, poll_s=0.01) for _ in range(3)]
+    with ThreadPoolExecutor(3) as ex:
+        list(ex.map(lambda w: w.get_or_compute("k", slow, 60), workers))
+    assert len(computed) == 1
+
+def test_degraded_result_is_shared_briefly_but_never_cached(make_store):
+    computed = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.1)
+        return {"degraded": True}
+
+    workers = [SharedResults(make_store(), poll_s=0.01, degraded_ttl_s=0.3) for _ in range(3)]
+    cacheable = lambda v: not v.get("degraded")
+    with ThreadPoolExecutor(3) as ex:
+        list(ex.map(lambda w: w.get_or_compute("k", compute, 60, cacheable=cacheable), workers))
+    assert len(computed) == 1
+    assert workers[0].store.get("k") is None
+    time.sleep(0.35)
+    workers[0].get_or_compute("k", compute, 60, cacheable=cacheable)
+    assert len(computed) == 2
+
+def test_bulk_runs_share_scrapes(stub, names):
+    shared = SharedResults(MemorySharedStore())
+    companies = [{"id": str(i), "canonical_name": n} for i, n in enumerate(names[:5])]
+    first = enrich_companies_public(companies, {}, max_workers=4, orchestrator=PublicEnrichmentOrchestrator(),
+                                    shared=shared)
+    scenarios.reset(scenarios.BenchContext(stub=stub, names=names))
+    requests0 = stub.requests
+    second = enrich_companies_public(companies, {}, max_workers=4, orchestrator=PublicEnrichmentOrchestrator(),
+                                     shared=shared)
+    assert stub.requests == requests0
+    assert second == first
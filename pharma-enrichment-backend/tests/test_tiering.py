@@ -0,0 +1,49 @@
+import random
+import pytest
+from tiering.batch import assign_tier_batch, compute_company_features_batch, features_to_dicts, products_to_columns
+from tiering.fallback import assign_tier, compute_company_features_from_products
+
+YEAR = 2025
+
+@pytest.fixture
+def products_by_company():
+    rng = random.Random(7)
+    tas = ["Oncology", "Cardiology", "Neuroscience", "", None, "Immunology"]
+    return {f"c{i}": [{"ta": rng.choice(tas), "launch_year": rng.choice([None, 0, 2015, 2020, 2022, 2024]),
+                       "is_marketed": rng.choice([True, False, None, 1, 0])} for _ in range(rng.randint(0, 8))]
+            for i in range(500)}
+
+def test_batch_features_match_scalar(products_by_company):
+    names = list(products_by_company)
+    scalar = [compute_company_features_from_products(products_by_company[n], year_now=YEAR) for n in names]
+    cols = products_to_columns(products_by_company)
+    batch = compute_company_features_batch(cols["company"], cols["ta"], cols["launch_year"], cols["is_marketed"],
+                                           companies=names, year_now=YEAR)
+    assert features_to_dicts(batch) == scalar
+
+def test_batch_tiers_match_scalar(products_by_company):
+    rng = random.Random(11)
+    names = list(products_by_company)
+    scalar = [compute_company_features_from_products(products_by_company[n], year_now=YEAR) for n in names]
+    cols = products_to_columns(products_by_company)
+    batch = compute_company_features_batch(cols["company"], cols["ta"], cols["launch_year"], cols["is_marketed"],
+                                           companies=names, year_now=YEAR)
+    big = [rng.choice([True, False, None]) for _ in names]
+    upcoming = [rng.choice([None, 0, 3]) for _ in names]
+    modality = [rng.choice([None, 0.5, 0.8]) for _ in names]
+
+    expected = [assign_tier(n, {"is_global_big_pharma": b}, d, num_upcoming=u, primary_modality_share=m)
+                for n, b, d, u, m in zip(names, big, scalar, upcoming, modality)]
+    got = assign_tier_batch(big, batch["top_ta_share"], batch["num_products"], batch["num_launches_recent"],
+                            upcoming, modality)
+    assert list(got) == expected
+    assert len(set(expected)) > 1  # the sample exercises more than one rule
+
+def test_explicit_thresholds_match_scalar(products_by_company):
+    names = list(products_by_company)
+    scalar = [compute_company_features_from_products(products_by_company[n], year_now=YEAR) for n in names]
+    kwargs = {"top_ta_share_thresh": 0.4, "platform_share_thresh": 0.5}
+    expected = [assign_tier(n, {}, d, **kwargs) for n, d in zip(names, scalar)]
+    got = assign_tier_batch([None] * len(names), [d["top_ta_share"] for d in scalar],
+                            [d["num_products"] for d in scalar], [d["num_launches_recent"] for d in scalar], **kwargs)
+    assert list(got) == expected
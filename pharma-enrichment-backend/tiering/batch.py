@@ -0,0 +1,178 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from tiering import fallback
+
+# Vectorized counterparts of compute_company_features_from_products / assign_tier for
+# re-tiering large universes at once. Inputs are columns (one entry per product row);
+# results match the scalar functions exactly. Missing values may be None or NaN.
+
+def _truthy(col: Any) -> np.ndarray:
+    """Python truthiness per element (None/0/""/False → False); NaN counts as missing."""
+    arr = np.asarray(col)
+    if arr.dtype == bool:
+        return arr
+    if arr.dtype.kind in "iu":
+        return arr != 0
+    if arr.dtype.kind == "f":
+        return (arr != 0) & ~np.isnan(arr)
+    return np.frompyfunc(lambda v: bool(v) and v == v, 1, 1)(arr).astype(bool)
+
+def _as_float(col: Any, mask: np.ndarray) -> np.ndarray:
+    arr = np.asarray(col)
+    if arr.dtype.kind in "iuf":
+        return arr.astype(np.float64)
+    out = np.zeros(len(arr), dtype=np.float64)
+    out[mask] = arr[mask].astype(np.float64)
+    return out
+
+def compute_company_features_batch(
+    company: Sequence[Any],
+    ta: Sequence[Any],
+    launch_year: Sequence[Any],
+    is_marketed: Sequence[Any],
+    companies: Optional[Sequence[Any]] = None,
+    year_now: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Columnar compute_company_features_from_products for every company at once.
+    company/ta/launch_year/is_marketed: aligned per-product columns; rows of one company keep
+        their original relative order (needed for the top-TA tie-break).
+    companies: output row order (companies without products get empty features);
+        defaults to the sorted unique company keys.
+    Returns columns "company", "top_ta" (object, None if no TA), "top_ta_share" (float, NaN
+    if no TA), "num_products", "num_launches_recent" (int64).
+    """
+    company = np.asarray(company)
+    n_rows = len(company)
+    if year_now is None:
+        year_now = datetime.now().year
+
+    if companies is None:
+        keys, codes = np.unique(company, return_inverse=True)
+    else:
+        keys = np.asarray(companies)
+        # Factorize both columns together, then map each product row to its position in `companies`
+        _, inv = np.unique(np.concatenate([keys, company]), return_inverse=True)
+        position = np.full(inv.max() + 1 if len(inv) else 0, -1, dtype=np.int64)
+        position[inv[:len(keys)][::-1]] = np.arange(len(keys))[::-1]
+        codes = position[inv[len(keys):]]
+    codes = codes.astype(np.int64)
+    n = len(keys)
+    known = codes >= 0
+
+    # Marketed products / recent launches: plain group counts
+    marketed = _truthy(is_marketed) & known
+    num_products = np.bincount(codes[marketed], minlength=n)
+    has_year = _truthy(launch_year) & known
+    years = _as_float(launch_year, has_year)
+    recent = has_year & (years >= year_now - 5)
+    num_launches_recent = np.bincount(codes[recent], minlength=n)
+
+    # Top TA: count (company, ta) pairs; ties go to the TA seen first for that company,
+    # which is what Counter.most_common(1) returns.
+    top_ta = np.full(n, None, dtype=object)
+    top_ta_share = np.full(n, np.nan)
+    has_ta = _truthy(ta) & known
+    if has_ta.any():
+        ta_vals = np.asarray(ta)[has_ta]
+        ta_keys, ta_codes = np.unique(ta_vals, return_inverse=True)
+        rows_c = codes[has_ta]
+        pair = rows_c * len(ta_keys) + ta_codes.astype(np.int64)
+        uniq, first, counts = np.unique(pair, return_index=True, return_counts=True)
+        pair_c = uniq // len(ta_keys)
+        pair_t = uniq % len(ta_keys)
+        order = np.lexsort((first, -counts, pair_c))
+        lead = order[np.r_[True, pair_c[order][1:] != pair_c[order][:-1]]]
+        totals = np.bincount(rows_c, minlength=n)
+        c = pair_c[lead]
+        top_ta[c] = ta_keys[pair_t[lead]].tolist()
+        top_ta_share[c] = counts[lead] / totals[c]
+
+    return {
+        "company": keys,
+        "top_ta": top_ta,
+        "top_ta_share": top_ta_share,
+        "num_products": num_products.astype(np.int64),
+        "num_launches_recent": num_launches_recent.astype(np.int64),
+    }
+
+def assign_tier_batch(
+    is_global_big_pharma: Sequence[Any],
+    top_ta_share: Sequence[Any],
+    num_products: Sequence[Any],
+    num_launches_recent: Sequence[Any],
+    num_upcoming: Optional[Sequence[Any]] = None,
+    primary_modality_share: Optional[Sequence[Any]] = None,
+    top_ta_share_thresh: Optional[float] = None,
+    platform_share_thresh: Optional[float] = None,
+) -> np.ndarray:
+    """Columnar assign_tier: same rule chain and thresholds, evaluated for all companies at once."""
+    if top_ta_share_thresh is None or platform_share_thresh is None:
+        current = fallback.current_thresholds()
+        if top_ta_share_thresh is None:
+            top_ta_share_thresh = current["top_ta_share_threshold"]
+        if platform_share_thresh is None:
+            platform_share_thresh = current["platform_share_threshold"]
+    big = _truthy(is_global_big_pharma)
+    n = len(big)
+
+    def num(col: Optional[Sequence[Any]]) -> np.ndarray:
+        # `x or 0` semantics: missing → 0
+        if col is None:
+            return np.zeros(n)
+        mask = _truthy(col)
+        return np.where(mask, _as_float(col, mask), 0.0)
+
+    def share(col: Optional[Sequence[Any]]) -> np.ndarray:
+        # None → NaN so every >= comparison is False
+        if col is None:
+            return np.full(n, np.nan)
+        arr = np.asarray(col)
+        if arr.dtype.kind in "iuf":
+            return arr.astype(np.float64)
+        present = np.frompyfunc(lambda v: v is not None, 1, 1)(arr).astype(bool)
+        out = np.full(n, np.nan)
+        out[present] = arr[present].astype(np.float64)
+        return out
+
+    ta_share = share(top_ta_share)
+    modality_share = share(primary_modality_share)
+    products = num(num_products)
+    launches = num(num_launches_recent)
+    upcoming = num(num_upcoming)
+
+    conditions = [
+        big,
+        (ta_share >= top_ta_share_thresh) & ((products >= 2) | (launches >= 1)),
+        (products == 0) & (upcoming > 0),
+        modality_share >= platform_share_thresh,
+        (products >= 1) | (launches >= 1),
+    ]
+    choices = ["TIER_1", "TA_SPECIALISTS", "FIRST_LAUNCHERS", "PLATFORM_BUILDERS", "MID_TIER"]
+    return np.select(conditions, np.array(choices, dtype=object), default="UNCLASSIFIED")
+
+def features_to_dicts(features: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Back to the scalar per-company dict shape (None instead of NaN, Python ints)."""
+    out = []
+    for i in range(len(features["company"])):
+        share = features["top_ta_share"][i]
+        out.append({
+            "top_ta": features["top_ta"][i],
+            "top_ta_share": None if np.isnan(share) else float(share),
+            "num_products": int(features["num_products"][i]),
+            "num_launches_recent": int(features["num_launches_recent"][i]),
+        })
+    return out
+
+def products_to_columns(products_by_company: Dict[Any, List[Dict[str, Any]]]) -> Dict[str, List[Any]]:
+    """Flatten the nested products_by_company shape into the columns the batch functions take."""
+    cols: Dict[str, List[Any]] = {"company": [], "ta": [], "launch_year": [], "is_marketed": []}
+    for key, products in products_by_company.items():
+        for p in products or []:
+            cols["company"].append(key)
+            cols["ta"].append(p.get("ta"))
+            cols["launch_year"].append(p.get("launch_year"))
+            cols["is_marketed"].append(p.get("is_marketed"))
+    return cols
@@ -1,15 +1,42 @@
 from __future__ import annotations
+import os
 from collections import Counter
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import Callable, List, Dict, Any, Optional
 
 # Configurable thresholds (could be loaded from admin_config)
-TOP_TA_SHARE_THRESH = 0.60
-PLATFORM_SHARE_THRESH = 0.70  # only if you later compute modality shares
+TOP_TA_SHARE_THRESH = float(os.environ.get("TOP_TA_SHARE_THRESH", "0.60"))
+PLATFORM_SHARE_THRESH = float(os.environ.get("PLATFORM_SHARE_THRESH", "0.70"))  # only if you later compute modality shares
 
-def compute_company_features_from_products(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Thresholds applied at runtime (e.g. ResultStore.thresholds), overriding the env defaults.
+# Called on every lookup, so it must be cheap (ResultStore serves an in-memory copy).
+_threshold_source: Optional[Callable[[], Dict[str, float]]] = None
+
+def use_threshold_source(source: Optional[Callable[[], Dict[str, float]]]) -> None:
+    global _threshold_source
+    _threshold_source = source
+
+def current_thresholds() -> Dict[str, float]:
+    """Thresholds assign_tier uses when none are passed explicitly."""
+    thresholds = {
+        "top_ta_share_threshold": TOP_TA_SHARE_THRESH,
+        "platform_share_threshold": PLATFORM_SHARE_THRESH,
+    }
+    if _threshold_source is not None:
+        thresholds.update(_threshold_source())
+    return thresholds
+
+def estimate_num_upcoming(late_stage_assets_count: Optional[int]) -> Optional[int]:
+    # Very naive: infer num_upcoming from late_stage_assets_count if not separately computed
+    if late_stage_assets_count and late_stage_assets_count > 0:
+        return max(0, int(late_stage_assets_count * 0.3))  # placeholder heuristic
+    return None
+
+def compute_company_features_from_products(products: List[Dict[str, Any]], year_now: Optional[int] = None) -> Dict[str, Any]:
     """
     products: list of dicts with keys like:
       { "ta": "Oncology", "launch_year": 2023, "modality": "mAb", "is_marketed": True }
+    year_now: reference year for "recent" launches (defaults to the current year)
     """
     ta_counts = Counter(p.get("ta") for p in products if p.get("ta"))
     total = sum(ta_counts.values())
@@ -21,8 +48,8 @@ def compute_company_features_from_products(products: List[Dict[str, Any]]) -> Di
 
     num_products = sum(1 for p in products if p.get("is_marketed"))
     # If you track launches:
-    from datetime import datetime
-    year_now = datetime.now().year
+    if year_now is None:
+        year_now = datetime.now().year
     num_launches_recent = sum(1 for p in products if p.get("launch_year") and p["launch_year"] >= year_now - 5)
 
     # You can compute num_upcoming elsewhere (e.g., from ClinicalTrials) and pass it in.
@@ -38,14 +65,24 @@ def assign_tier(
     enrichment: Dict[str, Any],
     derived: Dict[str, Any],
     num_upcoming: Optional[int] = None,
-    primary_modality_share: Optional[float] = None
+    primary_modality_share: Optional[float] = None,
+    top_ta_share_thresh: Optional[float] = None,
+    platform_share_thresh: Optional[float] = None
 ) -> str:
+    # Explicit thresholds are for what-if runs; default to the current configuration
+    if top_ta_share_thresh is None or platform_share_thresh is None:
+        current = current_thresholds()
+        if top_ta_share_thresh is None:
+            top_ta_share_thresh = current["top_ta_share_threshold"]
+        if platform_share_thresh is None:
+            platform_share_thresh = current["platform_share_threshold"]
+
     # 1) Tier 1 via seed
     if enrichment.get("is_global_big_pharma"):
         return "TIER_1"
 
     # 2) Therapeutic Area Specialist
-    if (derived.get("top_ta_share") is not None and derived["top_ta_share"] >= TOP_TA_SHARE_THRESH) and \
+    if (derived.get("top_ta_share") is not None and derived["top_ta_share"] >= top_ta_share_thresh) and \
        ((derived.get("num_products") or 0) >= 2 or (derived.get("num_launches_recent") or 0) >= 1):
         return "TA_SPECIALISTS"
 
@@ -54,7 +91,7 @@ def assign_tier(
         return "FIRST_LAUNCHERS"
 
     # 4) Focused Platform Builders (needs modality)
-    if primary_modality_share is not None and primary_modality_share >= PLATFORM_SHARE_THRESH:
+    if primary_modality_share is not None and primary_modality_share >= platform_share_thresh:
         return "PLATFORM_BUILDERS"
 
     # 5) Mid-Tier